@@ -18,11 +18,19 @@ interface ChatMessage {
   content: string;
 }
 
+interface VoiceSessionState {
+  crop?: string | null;
+  location?: string | null;
+  diagnosis?: Record<string, any> | null;
+  planStatus?: "none" | "partial" | "done";
+}
+
 interface VoiceChatProps {
   phone: string;
   language: string;
   imageUrls: string[];
   chatHistory?: ChatMessage[];
+  sessionState?: VoiceSessionState;
   onClose: () => void;
   onTranscript?: (message: ChatMessage) => void;
 }
@@ -144,7 +152,7 @@ function VoiceAssistantUI({
   );
 }
 
-export default function VoiceChat({ phone, language, imageUrls, chatHistory, onClose, onTranscript }: VoiceChatProps) {
+export default function VoiceChat({ phone, language, imageUrls, chatHistory, sessionState, onClose, onTranscript }: VoiceChatProps) {
   const [connectionDetails, setConnectionDetails] = useState<{
     token: string;
     url: string;
@@ -175,7 +183,7 @@ export default function VoiceChat({ phone, language, imageUrls, chatHistory, onC
         const resp = await fetch("/api/livekit/token", {
           method: "POST",
           headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ phone, language, imageUrls, chatHistory: chatHistory || [] }),
+          body: JSON.stringify({ phone, language, imageUrls, chatHistory: chatHistory || [], sessionState }),
         });
         if (cancelled) return;
         if (!resp.ok) {
@@ -1341,7 +1341,7 @@ export default function Home() {
               </span>
               <motion.div animate={{ scale: [1, 1.3, 1] }} transition={{ repeat: Infinity, duration: 1.5, delay: 0.5 }} className="w-2 h-2 rounded-full" style={{ backgroundColor: "#6BC30D" }} />
             </div>
-            <VoiceChat phone={phoneNumber} language={language} imageUrls={imageUrls} chatHistory={messages} onClose={() => setIsVoiceActive(false)} onTranscript={handleVoiceTranscript} />
+            <VoiceChat phone={phoneNumber} language={language} imageUrls={imageUrls} chatHistory={messages} sessionState={{ crop: extractedCrop, location: extractedLocation, diagnosis, planStatus: treatmentPlan || chatPhase === "plan_ready" ? "done" : "none" }} onClose={() => setIsVoiceActive(false)} onTranscript={handleVoiceTranscript} />
           </div>
         )}
 
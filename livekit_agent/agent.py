@@ -1,12 +1,25 @@
 import asyncio
 import os
 import json
+import time
 import logging
-import aiohttp
+from contextlib import aclosing
+from typing import AsyncIterator
 from dotenv import load_dotenv
 from livekit import agents
-from livekit.agents import Agent, AgentSession, JobContext
+from livekit.agents import Agent, AgentSession, JobContext, JobProcess, JobRequest
 from livekit.plugins import sarvam, google, silero
+from backend_client import BackendUnavailable, acquire_backend_client, get_backend_client, release_backend_client
+from task_scheduler import TurnTaskScheduler
+from lexicon import extract_crop_location, match_turn
+from intent import classify_plan_reply, is_plan_offer, mentions_plan
+from llm_stream import stream_sentences
+from diagnosis_cache import diagnosis_cache_key, get_diagnosis_cache
+from audio_cache import get_audio_cache
+from history import ConversationHistory
+from tracing import TurnTracer, format_summary, get_latency_recorder
+from capacity import get_load_reporter, get_worker_load_model
+from session_state import SessionState, load_session_state
 
 load_dotenv()
 
@@ -18,14 +31,35 @@ if not os.environ.get("GOOGLE_API_KEY"):
 logger = logging.getLogger("khetsaathi-agent")
 logger.setLevel(logging.INFO)
 
-BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:5000")
-
 LANGUAGE_MAP = {
     "English": {"stt": "en-IN", "tts": "en-IN"},
     "Hindi": {"stt": "hi-IN", "tts": "hi-IN"},
     "Telugu": {"stt": "te-IN", "tts": "te-IN"},
 }
 
+STT_PROMPTS = {
+    "Hindi": "खेती, किसान, फसल, बीमारी, कीटनाशक, दवाई, खाद, उर्वरक, टमाटर, धान, चावल, गेहूं, कपास, मिर्च, बैंगन, आम, केला, गन्ना, मूंगफली, सोयाबीन, प्याज, आलू, सरसों, चना, अरहर, मक्का, बाजरा, ज्वार, गाँव, जिला, तहसील, ब्लॉक, मंडी, सिंचाई, ड्रिप, स्प्रिंकलर, बोरवेल, नहर, झुलसा, पत्ती, तना, जड़, फल, फूल, पीलापन, धब्बे, कीड़ा, इल्ली, माहू, सफेद मक्खी, thrips, blight, wilt, fungicide, Mancozeb, neem oil, urea, DAP, potash",
+    "Telugu": "వ్యవసాయం, రైతు, పంట, వ్యాధి, పురుగుమందు, ఎరువు, టమాటో, వరి, గోధుమ, పత్తి, మిర్చి, వంకాయ, మామిడి, అరటి, చెరకు, వేరుశనగ, ఉల్లి, బంగాళదుంప, గ్రామం, మండలం, జిల్లా, నీటిపారుదల, బోరు, కాలువ, ఆకు, కాండం, వేరు, పండు, పువ్వు, పచ్చదనం, మచ్చలు, పురుగు, తెల్ల ఈగ, blight, wilt, fungicide, Mancozeb, neem oil, urea, DAP",
+    "English": "Agriculture, farming, crop disease, pesticide, fertilizer, tomato, rice, wheat, cotton, paddy, chilli, brinjal, mango, banana, sugarcane, groundnut, village, district, mandal, irrigation, drip, sprinkler, borewell, blight, wilt, fungicide, Mancozeb, neem oil, urea, DAP, potash"
+}
+
+STT_MODEL = "saarika:v2.5"
+LLM_MODEL = "gemini-2.0-flash"
+TTS_MODEL = "bulbul:v3"
+TTS_SPEAKER = "shubh"
+TTS_PACE = 0.9
+
+TURN_DEBOUNCE_SECONDS = float(os.environ.get("TURN_DEBOUNCE_SECONDS", "0.3"))
+DIAGNOSIS_MESSAGE_DEADLINE_SECONDS = float(os.environ.get("DIAGNOSIS_MESSAGE_DEADLINE_SECONDS", "8"))
+SPECULATIVE_DIAGNOSIS = os.environ.get("SPECULATIVE_DIAGNOSIS", "1") not in ("0", "false", "False")
+SPECULATIVE_DIAGNOSIS_WAIT_SECONDS = float(os.environ.get("SPECULATIVE_DIAGNOSIS_WAIT_SECONDS", "30"))
+BACKEND_EXTRACT_BUDGET_SECONDS = float(os.environ.get("BACKEND_EXTRACT_BUDGET_SECONDS", "4"))
+BACKEND_INTENT_BUDGET_SECONDS = float(os.environ.get("BACKEND_INTENT_BUDGET_SECONDS", "3"))
+BACKEND_DIAGNOSE_BUDGET_SECONDS = float(os.environ.get("BACKEND_DIAGNOSE_BUDGET_SECONDS", "45"))
+BACKEND_PLAN_BUDGET_SECONDS = float(os.environ.get("BACKEND_PLAN_BUDGET_SECONDS", "60"))
+PLAN_PROGRESS_SECTIONS = int(os.environ.get("PLAN_PROGRESS_SECTIONS", "2"))
+PLAN_PROGRESS_DEADLINE_SECONDS = float(os.environ.get("PLAN_PROGRESS_DEADLINE_SECONDS", "6"))
+
 GATHERING_PROMPT = """You are KhetSathi — think of yourself as a kind, experienced elder farmer who also happens to be a crop doctor. You genuinely care about the farmer and their family. You speak like a neighbor having chai together, not like a doctor in a clinic.
 
 CRITICAL LANGUAGE RULE: You MUST respond ENTIRELY in {LANGUAGE}. Every single word must be in {LANGUAGE}. Do NOT mix English words or phrases.
@@ -103,7 +137,14 @@ Keep responses short (1-2 sentences). Stay warm and neighborly. This is a voice
 
 
 class KhetSaathiAgent(Agent):
-    def __init__(self, language: str, image_urls: list, phone: str, chat_history: list[dict] | None = None):
+    def __init__(
+        self,
+        language: str,
+        image_urls: list,
+        phone: str,
+        chat_history: list[dict] | None = None,
+        state: SessionState | None = None,
+    ):
         self.user_language = language
         self.image_urls = image_urls
         self.phone = phone
@@ -112,32 +153,109 @@ class KhetSaathiAgent(Agent):
         self.diagnosis: dict | None = None
         self.diagnosis_in_progress = False
         self.plan_generated = False
+        self.plan_sections: list[dict] = []
         self.message_count = 0
-        self._conversation_history: list[dict] = chat_history[:] if chat_history else []
+        self.extraction_stats = {"local": 0, "remote": 0, "fallback": 0}
+        self.intent_stats = {"local": 0, "remote": 0, "fallback": 0}
+        self._plan_offer_pending = False
+        self._backend = get_backend_client()
+        self._scheduler = TurnTaskScheduler(debounce=TURN_DEBOUNCE_SECONDS)
+        self._diagnosis_cache = get_diagnosis_cache()
+        self._diagnosis_cache_key: str | None = None
+        self._audio_cache = get_audio_cache(TTS_SPEAKER, TTS_PACE, TTS_MODEL)
+        self._speculative_result: asyncio.Future | None = None
+        self.speculative_stats = {"started": 0, "hits": 0, "wasted": 0}
+        if state is not None:
+            chat_history = state.messages
+            self.extracted_crop = state.crop
+            self.extracted_location = state.location
+            self.diagnosis = state.diagnosis
+            self.plan_generated = state.plan_status != "none"
+        self._history = ConversationHistory(chat_history, summary=state.summary if state else "")
+        self._tracer = TurnTracer(self._history.session_id, language)
         self._has_prior_history = bool(chat_history and len(chat_history) > 0)
 
         if self._has_prior_history:
-            self.message_count = sum(1 for m in self._conversation_history if m.get("role") == "user")
+            self.message_count = sum(1 for m in chat_history if m.get("role") == "user")
+            self._restore_plan_offer()
 
-        instructions = GATHERING_PROMPT.replace("{LANGUAGE}", language)
+        if self.plan_generated:
+            self._tracer.phase = "plan"
+            instructions = PLAN_DONE_PROMPT.replace("{LANGUAGE}", language)
+        elif self.diagnosis:
+            self._tracer.phase = "diagnosis"
+            instructions = DIAGNOSIS_PROMPT.replace("{LANGUAGE}", language).replace("{DIAGNOSIS}", json.dumps(self.diagnosis))
+        else:
+            instructions = GATHERING_PROMPT.replace("{LANGUAGE}", language)
         if self._has_prior_history:
             history_summary = "\n".join(
                 f"{'Farmer' if m['role'] == 'user' else 'You'}: {m['content']}"
-                for m in self._conversation_history[-10:]
+                for m in self._history.recent(10)
             )
+            if self._history.summary:
+                history_summary = f"(Earlier)\n{self._history.summary}\n(Most recent)\n{history_summary}"
             instructions += f"\n\nIMPORTANT: This is a CONTINUING conversation. The farmer switched from text to voice. Here is the recent conversation so far:\n{history_summary}\n\nDo NOT repeat the greeting. Do NOT ask questions already answered. Continue naturally from where the conversation left off. Acknowledge the switch briefly and continue with the next unanswered question."
 
         super().__init__(instructions=instructions)
 
+    def _restore_plan_offer(self):
+        if not self.diagnosis or self.plan_generated:
+            return
+        recent = self._history.recent(1)
+        self._plan_offer_pending = bool(recent) and recent[-1]["role"] == "assistant" and is_plan_offer(recent[-1]["content"])
+
     async def on_enter(self):
+        if SPECULATIVE_DIAGNOSIS and self.image_urls and not self.diagnosis:
+            result = asyncio.get_running_loop().create_future()
+            self._speculative_result = result
+            self._scheduler.schedule("speculative_diagnosis", lambda: self._run_speculative_diagnosis(result), debounce=0)
+
         if self._has_prior_history:
-            resume_msg = self._get_resume_message()
-            self._conversation_history.append({"role": "assistant", "content": resume_msg})
-            self.session.say(resume_msg, add_to_chat_ctx=True)
+            self._say_fixed(self._get_resume_message())
+        else:
+            self._say_fixed(self._get_greeting())
+        self._scheduler.schedule("cache_fixed_audio", self._cache_fixed_utterances, debounce=0)
+
+    def _fixed_utterances(self) -> list[str]:
+        utterances = [self._get_greeting(), self._get_resume_message(), self._get_plan_fallback()]
+        if self.user_language in ("Hindi", "Telugu"):
+            utterances.append(self._get_diagnosis_fallback())
+        return utterances
+
+    def _say_fixed(self, text: str, cacheable: bool = True):
+        self._history.append({"role": "assistant", "content": text})
+        cached = self._audio_cache.get(text, self.user_language) if cacheable else None
+        if cached is not None:
+            self.session.say(text, audio=cached.frames(), add_to_chat_ctx=True)
         else:
-            greeting = self._get_greeting()
-            self._conversation_history.append({"role": "assistant", "content": greeting})
-            self.session.say(greeting, add_to_chat_ctx=True)
+            self.session.say(text, add_to_chat_ctx=True)
+
+    async def _cache_fixed_utterances(self):
+        tts = self.session.tts
+        if tts is None:
+            return
+        for text in self._fixed_utterances():
+            await self._audio_cache.store(tts, text, self.user_language)
+
+    def stats(self) -> dict:
+        return {
+            "tasks": self._scheduler.stats(),
+            "extraction": self.extraction_stats,
+            "plan_intent": self.intent_stats,
+            "diagnosis_cache": self._diagnosis_cache.stats(),
+            "speculative_diagnosis": self.speculative_stats,
+            "audio_cache": self._audio_cache.stats(),
+            "history": self._history.stats(),
+            "backend": self._backend.stats(),
+        }
+
+    def on_metrics(self, metrics):
+        self._tracer.on_metrics(metrics)
+
+    async def on_exit(self):
+        logger.info(f"Session stats: {self.stats()}")
+        logger.info(f"Worker latency percentiles:\n{format_summary(get_latency_recorder().summary())}")
+        await self._scheduler.close()
 
     def _get_resume_message(self) -> str:
         if self.user_language == "Telugu":
@@ -157,6 +275,7 @@ class KhetSaathiAgent(Agent):
 
     async def on_user_turn_completed(self, turn_ctx, new_message):  # type: ignore[override]
         self.message_count += 1
+        self._tracer.turn = self.message_count
 
         user_text = ""
         if hasattr(new_message, 'content'):
@@ -171,37 +290,140 @@ class KhetSaathiAgent(Agent):
             user_text = getattr(new_message, 'text', '')
 
         if user_text:
-            self._conversation_history.append({"role": "user", "content": user_text})
+            self._history.append({"role": "user", "content": user_text})
 
-        if self.message_count >= 2 and not self.extracted_crop and not self.diagnosis_in_progress:
-            asyncio.create_task(self._run_extraction())
+        if self.message_count >= 2 and not (self.extracted_crop and self.extracted_location) and not self.diagnosis_in_progress:
+            if self._run_local_extraction():
+                self._maybe_start_diagnosis()
+            else:
+                self._scheduler.schedule("extract", self._run_extraction)
+        elif not self._scheduler.is_busy("diagnosis"):
+            self._maybe_start_diagnosis()
 
         if self.diagnosis and not self.plan_generated:
-            asyncio.create_task(self._check_plan_intent())
+            self._route_plan_intent(user_text)
+
+    def record_assistant_message(self, text: str):
+        text = text.strip()
+        if not text:
+            return
+        if any(m.get("role") == "assistant" and m.get("content", "").strip() == text for m in self._history.recent(3)):
+            return
+        self._history.append({"role": "assistant", "content": text})
+        if self.diagnosis and is_plan_offer(text):
+            self._plan_offer_pending = True
+
+    def _route_plan_intent(self, user_text: str):
+        wants_plan = classify_plan_reply(user_text)
+        if self._plan_offer_pending:
+            self._plan_offer_pending = False
+        elif not mentions_plan(user_text):
+            # With no offer on the table, a bare yes/ok could still answer an
+            # offer the detector missed; anything else is not about the plan.
+            if wants_plan is not True:
+                return
+            wants_plan = None
+
+        if wants_plan is None:
+            self._scheduler.schedule("plan_intent", self._check_plan_intent)
+            return
+        self.intent_stats["local"] += 1
+        if wants_plan:
+            logger.info("Farmer asked for the treatment plan, generating...")
+            self._scheduler.schedule("plan", self._generate_plan, debounce=0)
+
+    def _run_local_extraction(self) -> bool:
+        local = extract_crop_location(self._history.messages())
+        if local.crop and not self.extracted_crop:
+            self.extracted_crop = local.crop
+            logger.info(f"Extracted crop locally: {self.extracted_crop}")
+        if local.location and not self.extracted_location:
+            self.extracted_location = local.location
+            logger.info(f"Extracted location locally: {self.extracted_location}")
+        if local.unsure:
+            return False
+        self.extraction_stats["local"] += 1
+        return True
+
+    def _run_fallback_extraction(self):
+        # Backend unreachable: settle for the lexicon's best guess, taking the
+        # first crop the farmer named even when they mentioned several.
+        messages = self._history.messages()
+        local = extract_crop_location(messages)
+        crops = [c for m in messages if m["role"] == "user" for c in match_turn(m["content"]).crops]
+        crop = local.crop or (crops[0] if crops else None)
+        if crop and not self.extracted_crop:
+            self.extracted_crop = crop
+            logger.info(f"Extracted crop from fallback: {self.extracted_crop}")
+        if local.location and not self.extracted_location:
+            self.extracted_location = local.location
+            logger.info(f"Extracted location from fallback: {self.extracted_location}")
+        self.extraction_stats["fallback"] += 1
+
+    def _maybe_start_diagnosis(self):
+        if self.extracted_crop and self.extracted_location and not self.diagnosis and not self.diagnosis_in_progress:
+            self._scheduler.schedule("diagnosis", self._run_diagnosis, debounce=0)
+
+    async def _post_conversation(self, path: str, budget: float, hedge: bool = False, **fields) -> dict | None:
+        for _ in range(2):
+            payload = {**self._history.sync_payload(), **fields}
+            with self._tracer.backend_span(path):
+                status, data = await self._backend.request_json(path, payload, budget=budget, hedge=hedge)
+            if status == 409:
+                logger.info(f"Backend lost conversation state for {path}, resyncing")
+                self._history.reset_sync()
+                continue
+            if status != 200 or data is None:
+                return None
+            self._history.ack(data.get("seq"))
+            return data
+        return None
+
+    async def _stream_conversation(self, path: str, budget: float, **fields) -> AsyncIterator[dict]:
+        for _ in range(2):
+            payload = {**self._history.sync_payload(), **fields, "stream": True}
+            with self._tracer.backend_span(path):
+                async with self._backend.stream(path, json=payload, budget=budget) as resp:
+                    if resp.status == 409:
+                        logger.info(f"Backend lost conversation state for {path}, resyncing")
+                        self._history.reset_sync()
+                        continue
+                    if resp.status != 200:
+                        return
+                    async for line in resp.content:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        event = json.loads(line)
+                        if "seq" in event:
+                            self._history.ack(event["seq"])
+                        yield event
+            return
 
     async def _run_extraction(self):
         try:
-            messages = self._conversation_history.copy()
-            if len(messages) < 2:
+            if len(self._history) < 2:
                 return
 
-            async with aiohttp.ClientSession() as http_session:
-                async with http_session.post(
-                    f"{BACKEND_URL}/api/chat/extract",
-                    json={"messages": messages},
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        if data.get("crop"):
-                            self.extracted_crop = data["crop"]
-                            logger.info(f"Extracted crop: {self.extracted_crop}")
-                        if data.get("location"):
-                            self.extracted_location = data["location"]
-                            logger.info(f"Extracted location: {self.extracted_location}")
-
-                        if self.extracted_crop and self.extracted_location and not self.diagnosis and not self.diagnosis_in_progress:
-                            await self._run_diagnosis()
+            self.extraction_stats["remote"] += 1
+            try:
+                data = await self._post_conversation(
+                    "/api/chat/extract", budget=BACKEND_EXTRACT_BUDGET_SECONDS, hedge=True
+                )
+            except BackendUnavailable as e:
+                logger.warning(f"Extraction falling back to local lexicon: {e}")
+                self._run_fallback_extraction()
+                self._maybe_start_diagnosis()
+                return
+            if data is not None:
+                if data.get("crop") and not self.extracted_crop:
+                    self.extracted_crop = data["crop"]
+                    logger.info(f"Extracted crop: {self.extracted_crop}")
+                if data.get("location") and not self.extracted_location:
+                    self.extracted_location = data["location"]
+                    logger.info(f"Extracted location: {self.extracted_location}")
+
+                self._maybe_start_diagnosis()
         except Exception as e:
             logger.error(f"Extraction error: {e}")
 
@@ -210,51 +432,109 @@ class KhetSaathiAgent(Agent):
             return
         self.diagnosis_in_progress = True
         try:
-            async with aiohttp.ClientSession() as http_session:
-                async with http_session.post(
-                    f"{BACKEND_URL}/api/chat/diagnose",
-                    json={
-                        "imageUrls": self.image_urls,
-                        "crop": self.extracted_crop,
-                        "location": self.extracted_location,
-                        "language": self.user_language,
-                    },
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        self.diagnosis = data.get("diagnosis")
-                        logger.info("Diagnosis complete, updating agent instructions")
-
-                        new_instructions = DIAGNOSIS_PROMPT.replace(
-                            "{LANGUAGE}", self.user_language
-                        ).replace("{DIAGNOSIS}", json.dumps(self.diagnosis))
-
-                        await self.update_instructions(new_instructions)
-                        logger.info("Updated agent instructions with diagnosis results")
-
-                        diagnosis_msg = await self._build_diagnosis_message()
-                        if diagnosis_msg:
-                            self._conversation_history.append({"role": "assistant", "content": diagnosis_msg})
-                            self.session.say(diagnosis_msg, add_to_chat_ctx=True)
-                            logger.info("Spoke diagnosis results to farmer")
+            self._diagnosis_cache_key = diagnosis_cache_key(
+                self.image_urls, self.extracted_crop, self.extracted_location, self.user_language
+            )
+            # A full-key hit (e.g. a reconnect) carries the spoken message too;
+            # the speculative image-only result is only used on a miss.
+            async def compute():
+                speculative = await self._take_speculative_diagnosis()
+                return speculative if speculative is not None else await self._fetch_diagnosis()
+
+            entry, cached = await self._diagnosis_cache.get_or_compute(self._diagnosis_cache_key, compute)
+            if not entry:
+                return
+            self.diagnosis = entry["diagnosis"]
+            self._tracer.phase = "diagnosis"
+            logger.info(f"Diagnosis {'served from cache' if cached else 'complete'}, updating agent instructions")
+
+            new_instructions = DIAGNOSIS_PROMPT.replace(
+                "{LANGUAGE}", self.user_language
+            ).replace("{DIAGNOSIS}", json.dumps(self.diagnosis))
+
+            await self.update_instructions(new_instructions)
+            logger.info("Updated agent instructions with diagnosis results")
+
+            if entry.get("message"):
+                self._history.append({"role": "assistant", "content": entry["message"]})
+                self.session.say(entry["message"], add_to_chat_ctx=True)
+            else:
+                await self._speak_diagnosis_message()
+            logger.info("Spoke diagnosis results to farmer")
         except Exception as e:
             logger.error(f"Diagnosis error: {e}")
         finally:
             self.diagnosis_in_progress = False
 
-    async def _build_diagnosis_message(self) -> str:
-        if not self.diagnosis:
-            return ""
+    async def _run_speculative_diagnosis(self, future: asyncio.Future):
+        # The future is resolved through this reference, not the attribute:
+        # _take_speculative_diagnosis clears the attribute before awaiting it.
+        self.speculative_stats["started"] += 1
+        result = None
+        try:
+            key = diagnosis_cache_key(self.image_urls, None, None, self.user_language)
+            result, _ = await self._diagnosis_cache.get_or_compute(key, lambda: self._fetch_diagnosis(crop="", location=""))
+            if result:
+                logger.info("Speculative image-only diagnosis ready")
+        except Exception as e:
+            logger.error(f"Speculative diagnosis error: {e}")
+        finally:
+            if not future.done():
+                future.set_result(result)
+
+    async def _take_speculative_diagnosis(self) -> dict | None:
+        if self._speculative_result is None:
+            return None
+        future, self._speculative_result = self._speculative_result, None
+        try:
+            entry = await asyncio.wait_for(asyncio.shield(future), SPECULATIVE_DIAGNOSIS_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Speculative diagnosis did not finish in time, diagnosing with crop and location")
+            entry = None
+        if not entry:
+            self.speculative_stats["wasted"] += 1
+            return None
+        if self._speculation_contradicts(entry["diagnosis"]):
+            self.speculative_stats["wasted"] += 1
+            logger.info(f"Discarding speculative diagnosis, it does not match crop {self.extracted_crop}")
+            return None
+        self.speculative_stats["hits"] += 1
+        logger.info("Confirmed speculative diagnosis against farmer's crop and location")
+        diagnosis = {**entry["diagnosis"], "crop": self.extracted_crop, "location": self.extracted_location}
+        return {"diagnosis": diagnosis}
+
+    def _speculation_contradicts(self, diagnosis: dict) -> bool:
+        text = " ".join(str(diagnosis.get(field) or "") for field in ("crop", "disease"))
+        speculative_crops = match_turn(text).crops
+        if not speculative_crops:
+            return False
+        farmer_crops = match_turn(self.extracted_crop or "").crops
+        if farmer_crops:
+            return not set(farmer_crops) & set(speculative_crops)
+        return (self.extracted_crop or "").strip().lower() not in text.lower()
+
+    async def _fetch_diagnosis(self, crop: str | None = None, location: str | None = None) -> dict | None:
+        with self._tracer.backend_span("/api/chat/diagnose"):
+            status, data = await self._backend.request_json(
+                "/api/chat/diagnose",
+                {
+                    "imageUrls": self.image_urls,
+                    "crop": self.extracted_crop if crop is None else crop,
+                    "location": self.extracted_location if location is None else location,
+                    "language": self.user_language,
+                },
+                budget=BACKEND_DIAGNOSE_BUDGET_SECONDS,
+                retries=1,
+            )
+        if status != 200 or not data or not data.get("diagnosis"):
+            return None
+        return {"diagnosis": data["diagnosis"]}
+
+    def _diagnosis_message_prompt(self) -> str:
         disease = self.diagnosis.get("disease", "")
         recommended_pesticide = self.diagnosis.get("recommended_pesticide", "")
         immediate_action = self.diagnosis.get("immediate_action", "")
-
-        try:
-            from google import genai
-            api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY", "")
-            client = genai.Client(api_key=api_key)
-            prompt = f"""Generate a SHORT diagnosis message (2-3 sentences max) in {self.user_language} for a farmer.
+        return f"""Generate a SHORT diagnosis message (2-3 sentences max) in {self.user_language} for a farmer.
 Disease: {disease}
 Recommended pesticide: {recommended_pesticide}
 Immediate action: {immediate_action}
@@ -269,38 +549,92 @@ Rules:
 7) Be warm like a caring elder farmer neighbor.
 8) Just return the message text, nothing else."""
 
-            response = client.models.generate_content(model="gemini-2.0-flash", contents=prompt)
-            msg = response.text.strip()
-            if msg:
-                logger.info(f"Generated localized diagnosis message: {msg[:50]}...")
-                return msg
+    async def _say_streamed(self, prompt: str, deadline: float, on_complete=None) -> bool:
+        sentences = stream_sentences(prompt, deadline=deadline)
+        try:
+            first_sentence = await sentences.__anext__()
+        except StopAsyncIteration:
+            first_sentence = ""
         except Exception as e:
-            logger.error(f"Failed to generate localized diagnosis message: {e}")
+            logger.error(f"Failed to generate streamed message: {e!r}")
+            first_sentence = ""
+
+        if not first_sentence:
+            await sentences.aclose()
+            return False
+
+        logger.info(f"Streaming message: {first_sentence[:50]}...")
+
+        async def spoken_sentences():
+            spoken = [first_sentence]
+            completed = False
+            try:
+                yield first_sentence
+                async for sentence in sentences:
+                    spoken.append(sentence)
+                    yield sentence
+                completed = True
+            except Exception as e:
+                logger.error(f"Streamed message cut short: {e!r}")
+            finally:
+                message = "".join(spoken).strip()
+                self.record_assistant_message(message)
+                if completed and on_complete is not None:
+                    on_complete(message)
+
+        self.session.say(spoken_sentences(), add_to_chat_ctx=True)
+        return True
+
+    async def _speak_diagnosis_message(self):
+        if not self.diagnosis:
+            return
 
+        cache_key = self._diagnosis_cache_key
+
+        def cache_message(message: str):
+            if cache_key:
+                self._scheduler.schedule(
+                    "cache_diagnosis_message",
+                    lambda: self._diagnosis_cache.update(cache_key, message=message),
+                    debounce=0,
+                )
+
+        spoken = await self._say_streamed(
+            self._diagnosis_message_prompt(),
+            DIAGNOSIS_MESSAGE_DEADLINE_SECONDS,
+            on_complete=cache_message,
+        )
+        if not spoken:
+            self._say_fixed(self._get_diagnosis_fallback(), cacheable=self.user_language in ("Hindi", "Telugu"))
+
+    def _get_diagnosis_fallback(self) -> str:
         if self.user_language == "Hindi":
             return "आपकी फसल में बीमारी मिली है। चिंता मत करिए, हम इसका इलाज कर सकते हैं! कुछ और सवाल पूछकर मैं आपको पूरी योजना बनाकर दूँगा।"
         elif self.user_language == "Telugu":
             return "మీ పంటలో వ్యాధి కనుగొనబడింది. చింతించకండి, మనం దీన్ని నయం చేయగలం! కొన్ని ప్రశ్నలు అడిగి పూర్తి ప్రణాళిక తయారు చేస్తాను."
         else:
+            disease = self.diagnosis.get("disease", "") if self.diagnosis else ""
             return f"I've found the issue with your crop — it's {disease}. Don't worry, we can treat this together! Let me ask a few more questions to prepare a complete plan for you."
 
     async def _check_plan_intent(self):
         try:
-            messages = self._conversation_history.copy()
-            if len(messages) < 4:
+            if len(self._history) < 4:
                 return
 
-            async with aiohttp.ClientSession() as http_session:
-                async with http_session.post(
-                    f"{BACKEND_URL}/api/chat/detect-plan-intent",
-                    json={"messages": messages},
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        if data.get("wantsPlan") and not self.plan_generated:
-                            logger.info("Farmer wants treatment plan, generating...")
-                            await self._generate_plan()
+            self.intent_stats["remote"] += 1
+
+            try:
+                data = await self._post_conversation(
+                    "/api/chat/detect-plan-intent", budget=BACKEND_INTENT_BUDGET_SECONDS, hedge=True
+                )
+            except BackendUnavailable as e:
+                logger.warning(f"Plan intent falling back to local phrases: {e}")
+                self.intent_stats["fallback"] += 1
+                last_user = next((m["content"] for m in reversed(self._history.messages()) if m["role"] == "user"), "")
+                data = {"wantsPlan": classify_plan_reply(last_user) is True}
+            if data is not None and data.get("wantsPlan") and not self.plan_generated:
+                logger.info("Farmer wants treatment plan, generating...")
+                self._scheduler.schedule("plan", self._generate_plan, debounce=0)
         except Exception as e:
             logger.error(f"Plan intent check error: {e}")
 
@@ -308,38 +642,98 @@ Rules:
         if self.plan_generated:
             return
         self.plan_generated = True
+        self.plan_sections = []
+        done: dict | None = None
+        started = time.perf_counter()
         try:
-            async with aiohttp.ClientSession() as http_session:
-                async with http_session.post(
-                    f"{BACKEND_URL}/api/chat/generate-plan",
-                    json={
-                        "messages": self._conversation_history,
-                        "diagnosis": self.diagnosis,
-                        "language": self.user_language,
-                        "imageUrls": self.image_urls,
-                        "phone": self.phone,
-                    },
-                    timeout=aiohttp.ClientTimeout(total=60)
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        plan_summary = data.get("planSummaryMessage", "")
-                        logger.info("Plan generated successfully")
-
-                        new_instructions = PLAN_DONE_PROMPT.replace("{LANGUAGE}", self.user_language)
-                        await self.update_instructions(new_instructions)
-
-                        if plan_summary:
-                            self._conversation_history.append({"role": "assistant", "content": plan_summary})
-                            self.session.say(plan_summary, add_to_chat_ctx=True)
-                            logger.info("Spoke plan summary to farmer")
-                        else:
-                            fallback = self._get_plan_fallback()
-                            self._conversation_history.append({"role": "assistant", "content": fallback})
-                            self.session.say(fallback, add_to_chat_ctx=True)
+            events = self._stream_conversation(
+                "/api/chat/generate-plan",
+                budget=BACKEND_PLAN_BUDGET_SECONDS,
+                diagnosis=self.diagnosis,
+                language=self.user_language,
+                imageUrls=self.image_urls,
+                phone=self.phone,
+            )
+            async with aclosing(events):
+                async for event in events:
+                    kind = event.get("type")
+                    if kind == "section":
+                        self.plan_sections.append({"title": event.get("title", ""), "content": event.get("content", "")})
+                        if len(self.plan_sections) == 1:
+                            self._tracer.record("plan_first_section", (time.perf_counter() - started) * 1000)
+                        if len(self.plan_sections) == PLAN_PROGRESS_SECTIONS:
+                            await self._say_streamed(
+                                self._plan_progress_prompt(), PLAN_PROGRESS_DEADLINE_SECONDS
+                            )
+                    elif kind == "done":
+                        done = event
+                    elif kind == "error":
+                        logger.error(f"Plan stream failed after {len(self.plan_sections)} sections: {event.get('message')}")
+                        break
+        except BackendUnavailable as e:
+            logger.error(f"Plan generation unavailable: {e}")
+            if not self.plan_sections:
+                self.plan_generated = False
+                self._say_fixed(self._get_plan_unavailable_message(), cacheable=False)
+                return
         except Exception as e:
             logger.error(f"Plan generation error: {e}")
+
+        if done is None and not self.plan_sections:
             self.plan_generated = False
+            return
+
+        try:
+            self._tracer.phase = "plan"
+            new_instructions = PLAN_DONE_PROMPT.replace("{LANGUAGE}", self.user_language)
+            if done is None:
+                logger.info(f"Keeping {len(self.plan_sections)} plan sections from an incomplete stream")
+                new_instructions += f"\n\nOnly the first part of the plan could be prepared. These sections are ready:\n{self._plan_text()}"
+            await self.update_instructions(new_instructions)
+
+            plan_summary = done.get("planSummaryMessage", "") if done else ""
+            if done is None:
+                self._say_fixed(self._get_partial_plan_message(), cacheable=False)
+            elif plan_summary:
+                self._history.append({"role": "assistant", "content": plan_summary})
+                self.session.say(plan_summary, add_to_chat_ctx=True)
+                logger.info("Spoke plan summary to farmer")
+            else:
+                self._say_fixed(self._get_plan_fallback())
+            logger.info(f"Plan ready with {len(self.plan_sections)} sections")
+        except Exception as e:
+            logger.error(f"Plan delivery error: {e}")
+
+    def _plan_text(self) -> str:
+        return "\n\n".join(f"## {s['title']}\n{s['content']}".strip() for s in self.plan_sections)
+
+    def _plan_progress_prompt(self) -> str:
+        return f"""The first part of a 7-day crop treatment plan is ready. Write a SHORT spoken update (2 sentences max) in {self.user_language} for the farmer.
+Plan so far:
+{self._plan_text()[:1500]}
+
+Rules:
+1) Say the rest of the plan is still being prepared
+2) Tell the ONE most important thing to do on Day 1 in simple words
+3) Do NOT use English words for disease, symptoms, or actions. Only pesticide brand names can be in English.
+4) Keep it SHORT — this will be spoken aloud in a voice conversation.
+5) Just return the message text, nothing else."""
+
+    def _get_plan_unavailable_message(self) -> str:
+        if self.user_language == "Hindi":
+            return "माफ़ कीजिए, अभी योजना नहीं बन पा रही है। थोड़ी देर में फिर से कहिए, मैं दोबारा कोशिश करूँगा।"
+        elif self.user_language == "Telugu":
+            return "క్షమించండి, ఇప్పుడు ప్రణాళిక తయారు కావడం లేదు. కాసేపటి తర్వాత మళ్ళీ అడగండి, మళ్ళీ ప్రయత్నిస్తాను."
+        else:
+            return "Sorry, I can't prepare the plan right now. Ask me again in a little while and I'll try once more."
+
+    def _get_partial_plan_message(self) -> str:
+        if self.user_language == "Hindi":
+            return "मैं आपकी योजना का पहला हिस्सा ही तैयार कर पाया। उसके हिसाब से काम शुरू कीजिए, और बाकी दिनों के बारे में कुछ भी पूछिए।"
+        elif self.user_language == "Telugu":
+            return "మీ ప్రణాళికలో మొదటి భాగం మాత్రమే సిద్ధం చేయగలిగాను. దాని ప్రకారం పని మొదలుపెట్టండి, మిగతా రోజుల గురించి ఏదైనా అడగండి."
+        else:
+            return "I could only prepare the first part of your plan. Start with those steps, and ask me anything about the remaining days."
 
     def _get_plan_fallback(self) -> str:
         if self.user_language == "Hindi":
@@ -350,7 +744,69 @@ Rules:
             return "Your 7-day treatment plan is ready! It has all the details for treating your crop. Feel free to ask if you have any questions."
 
 
+def build_stt(language: str):
+    lang_config = LANGUAGE_MAP.get(language, LANGUAGE_MAP["English"])
+    return sarvam.STT(
+        language=lang_config["stt"],
+        model=STT_MODEL,
+        prompt=STT_PROMPTS.get(language, STT_PROMPTS["English"]),
+    )
+
+
+def build_tts(language: str):
+    lang_config = LANGUAGE_MAP.get(language, LANGUAGE_MAP["English"])
+    return sarvam.TTS(
+        target_language_code=lang_config["tts"],
+        model=TTS_MODEL,
+        speaker=TTS_SPEAKER,
+        pace=TTS_PACE,
+        enable_preprocessing=True,
+    )
+
+
+def prewarm(proc: JobProcess):
+    start = time.perf_counter()
+    proc.userdata["vad"] = silero.VAD.load()
+
+    plugins = {}
+    for language in LANGUAGE_MAP:
+        try:
+            plugins[language] = {"stt": build_stt(language), "tts": build_tts(language)}
+        except Exception as e:
+            logger.error(f"Prewarm of {language} speech plugins failed: {e}")
+    proc.userdata["plugins"] = plugins
+
+    try:
+        proc.userdata["llm"] = google.LLM(model=LLM_MODEL)
+    except Exception as e:
+        logger.error(f"Prewarm of LLM failed: {e}")
+
+    logger.info(f"Worker process prewarmed in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def bind_plugins(userdata: dict, language: str) -> dict:
+    # Prewarmed plugins when this process has them, built on the spot otherwise.
+    plugin_language = language if language in LANGUAGE_MAP else "English"
+    plugins = userdata.get("plugins", {}).get(plugin_language)
+    if plugins is None:
+        plugins = {"stt": build_stt(plugin_language), "tts": build_tts(plugin_language)}
+    return {
+        "stt": plugins["stt"],
+        "llm": userdata.get("llm") or google.LLM(model=LLM_MODEL),
+        "tts": plugins["tts"],
+        "vad": userdata.get("vad") or silero.VAD.load(),
+    }
+
+
 async def entrypoint(ctx: JobContext):
+    job_started = time.perf_counter()
+    backend = acquire_backend_client()
+    ctx.add_shutdown_callback(release_backend_client)
+    load_reporter = get_load_reporter()
+    load_reporter.session_started()
+    ctx.add_shutdown_callback(load_reporter.session_ended)
+    warmup = asyncio.create_task(backend.warm())
+
     await ctx.connect()
 
     room = ctx.room
@@ -362,52 +818,77 @@ async def entrypoint(ctx: JobContext):
         except Exception:
             pass
 
+    # New rooms carry only a short stateKey; the snapshot is read off the
+    # event loop while the speech plugins are bound below.
+    state_key = metadata.get("stateKey")
+    state_task = asyncio.create_task(load_session_state(state_key)) if state_key else None
+
     language = metadata.get("language", "English")
     phone = metadata.get("phone", "")
     image_urls = metadata.get("imageUrls", [])
     chat_history = metadata.get("chatHistory", [])
 
-    lang_config = LANGUAGE_MAP.get(language, LANGUAGE_MAP["English"])
+    session = AgentSession(**bind_plugins(ctx.proc.userdata, language))
 
-    STT_PROMPTS = {
-        "Hindi": "खेती, किसान, फसल, बीमारी, कीटनाशक, दवाई, खाद, उर्वरक, टमाटर, धान, चावल, गेहूं, कपास, मिर्च, बैंगन, आम, केला, गन्ना, मूंगफली, सोयाबीन, प्याज, आलू, सरसों, चना, अरहर, मक्का, बाजरा, ज्वार, गाँव, जिला, तहसील, ब्लॉक, मंडी, सिंचाई, ड्रिप, स्प्रिंकलर, बोरवेल, नहर, झुलसा, पत्ती, तना, जड़, फल, फूल, पीलापन, धब्बे, कीड़ा, इल्ली, माहू, सफेद मक्खी, thrips, blight, wilt, fungicide, Mancozeb, neem oil, urea, DAP, potash",
-        "Telugu": "వ్యవసాయం, రైతు, పంట, వ్యాధి, పురుగుమందు, ఎరువు, టమాటో, వరి, గోధుమ, పత్తి, మిర్చి, వంకాయ, మామిడి, అరటి, చెరకు, వేరుశనగ, ఉల్లి, బంగాళదుంప, గ్రామం, మండలం, జిల్లా, నీటిపారుదల, బోరు, కాలువ, ఆకు, కాండం, వేరు, పండు, పువ్వు, పచ్చదనం, మచ్చలు, పురుగు, తెల్ల ఈగ, blight, wilt, fungicide, Mancozeb, neem oil, urea, DAP",
-        "English": "Agriculture, farming, crop disease, pesticide, fertilizer, tomato, rice, wheat, cotton, paddy, chilli, brinjal, mango, banana, sugarcane, groundnut, village, district, mandal, irrigation, drip, sprinkler, borewell, blight, wilt, fungicide, Mancozeb, neem oil, urea, DAP, potash"
-    }
-
-    stt_prompt = STT_PROMPTS.get(language, STT_PROMPTS["English"])
-
-    session = AgentSession(
-        stt=sarvam.STT(
-            language=lang_config["stt"],
-            model="saarika:v2.5",
-            prompt=stt_prompt,
-        ),
-        llm=google.LLM(
-            model="gemini-2.0-flash",
-        ),
-        tts=sarvam.TTS(
-            target_language_code=lang_config["tts"],
-            model="bulbul:v3",
-            speaker="shubh",
-            pace=0.9,
-            enable_preprocessing=True,
-        ),
-        vad=silero.VAD.load(),
-    )
+    state = await state_task if state_task else None
+    if state is not None:
+        image_urls = image_urls or state.image_urls
+        phone = phone or state.phone
+        logger.info(
+            f"Restored session state {state_key}: {len(state.messages)} messages, "
+            f"diagnosis={'yes' if state.diagnosis else 'no'}, plan={state.plan_status}"
+        )
 
     agent = KhetSaathiAgent(
         language=language,
         image_urls=image_urls,
         phone=phone,
         chat_history=chat_history,
+        state=state,
     )
 
+    @session.on("conversation_item_added")
+    def _on_conversation_item_added(event):
+        item = event.item
+        if getattr(item, "role", None) == "assistant":
+            agent.record_assistant_message(item.text_content or "")
+
+    @session.on("metrics_collected")
+    def _on_metrics_collected(event):
+        agent.on_metrics(event.metrics)
+
+    first_speech_logged = False
+
+    @session.on("agent_state_changed")
+    def _on_agent_state_changed(event):
+        nonlocal first_speech_logged
+        if event.new_state == "speaking" and not first_speech_logged:
+            first_speech_logged = True
+            startup_ms = (time.perf_counter() - job_started) * 1000
+            logger.info(f"Startup: job assigned to first greeting audio in {startup_ms:.0f} ms (prewarmed={'vad' in ctx.proc.userdata})")
+
     await session.start(
         room=room,
         agent=agent,
     )
+    await warmup
+
+
+async def request_fnc(req: JobRequest):
+    # load_fnc is only reported every few seconds; check again at assignment
+    # time so a burst of rooms spills over to other workers.
+    if get_worker_load_model().admit():
+        await req.accept()
+    else:
+        await req.reject()
 
 
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
+    load_model = get_worker_load_model()
+    agents.cli.run_app(agents.WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
+        request_fnc=request_fnc,
+        load_fnc=load_model.load,
+        load_threshold=load_model.threshold,
+    ))
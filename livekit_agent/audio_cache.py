@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+from typing import AsyncIterator
+
+from livekit import rtc
+
+logger = logging.getLogger("khetsaathi-agent")
+
+TTS_AUDIO_CACHE_DIR = os.environ.get("TTS_AUDIO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "khetsaathi-tts"))
+FRAME_MS = 20
+BYTES_PER_SAMPLE = 2
+
+
+def audio_cache_key(text: str, language: str, voice: str, pace: float, model: str) -> str:
+    payload = json.dumps([text.strip(), language, voice, pace, model], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedAudio:
+    def __init__(self, pcm: mmap.mmap, sample_rate: int, num_channels: int):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+
+    async def frames(self) -> AsyncIterator[rtc.AudioFrame]:
+        samples_per_frame = self.sample_rate * FRAME_MS // 1000
+        frame_bytes = samples_per_frame * self.num_channels * BYTES_PER_SAMPLE
+        for offset in range(0, len(self.pcm), frame_bytes):
+            chunk = self.pcm[offset:offset + frame_bytes]
+            yield rtc.AudioFrame(
+                data=chunk,
+                sample_rate=self.sample_rate,
+                num_channels=self.num_channels,
+                samples_per_channel=len(chunk) // (self.num_channels * BYTES_PER_SAMPLE),
+            )
+
+
+class AudioCache:
+    def __init__(self, voice: str, pace: float, model: str, directory: str = TTS_AUDIO_CACHE_DIR):
+        self.voice = voice
+        self.pace = pace
+        self.model = model
+        self.directory = directory
+        self._loaded: dict[str, CachedAudio] = {}
+        self._generating: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, text: str, language: str) -> str:
+        return audio_cache_key(text, language, self.voice, self.pace, self.model)
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        base = os.path.join(self.directory, key)
+        return f"{base}.pcm", f"{base}.json"
+
+    def _load(self, key: str) -> CachedAudio | None:
+        if key in self._loaded:
+            return self._loaded[key]
+        pcm_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(pcm_path, "rb") as f:
+                pcm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        except Exception as e:
+            logger.error(f"Audio cache load error: {e}")
+            return None
+        cached = CachedAudio(pcm, meta["sample_rate"], meta["num_channels"])
+        self._loaded[key] = cached
+        return cached
+
+    def get(self, text: str, language: str) -> CachedAudio | None:
+        cached = self._load(self.key(text, language))
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def _write(self, key: str, pcm: bytes, sample_rate: int, num_channels: int):
+        pcm_path, meta_path = self._paths(key)
+        with open(f"{pcm_path}.tmp", "wb") as f:
+            f.write(pcm)
+        os.replace(f"{pcm_path}.tmp", pcm_path)
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"sample_rate": sample_rate, "num_channels": num_channels}, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    async def store(self, tts, text: str, language: str):
+        key = self.key(text, language)
+        if key in self._generating or self._load(key) is not None:
+            return
+        self._generating.add(key)
+        try:
+            pcm = bytearray()
+            sample_rate = num_channels = 0
+            async with tts.synthesize(text) as stream:
+                async for event in stream:
+                    frame = event.frame
+                    sample_rate, num_channels = frame.sample_rate, frame.num_channels
+                    pcm.extend(frame.data.tobytes())
+            if pcm and sample_rate:
+                await asyncio.to_thread(self._write, key, bytes(pcm), sample_rate, num_channels)
+                logger.info(f"Cached {len(pcm)} bytes of {language} TTS audio for fixed utterance")
+        except Exception as e:
+            logger.error(f"Audio cache synthesis error: {e}")
+        finally:
+            self._generating.discard(key)
+
+    def stats(self) -> dict:
+        return {"loaded": len(self._loaded), "hits": self.hits, "misses": self.misses}
+
+
+_audio_caches: dict[tuple, AudioCache] = {}
+
+
+def get_audio_cache(voice: str, pace: float, model: str) -> AudioCache:
+    key = (voice, pace, model)
+    if key not in _audio_caches:
+        _audio_caches[key] = AudioCache(voice=voice, pace=pace, model=model)
+    return _audio_caches[key]
@@ -0,0 +1,337 @@
+import asyncio
+import os
+import time
+import logging
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from tracing import percentile
+
+logger = logging.getLogger("khetsaathi-agent")
+
+BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:5000")
+BACKEND_POOL_LIMIT = int(os.environ.get("BACKEND_POOL_LIMIT", "100"))
+BACKEND_POOL_LIMIT_PER_HOST = int(os.environ.get("BACKEND_POOL_LIMIT_PER_HOST", "20"))
+BACKEND_KEEPALIVE_SECONDS = float(os.environ.get("BACKEND_KEEPALIVE_SECONDS", "60"))
+BACKEND_DNS_CACHE_SECONDS = int(os.environ.get("BACKEND_DNS_CACHE_SECONDS", "300"))
+BACKEND_BREAKER_FAILURES = int(os.environ.get("BACKEND_BREAKER_FAILURES", "5"))
+BACKEND_BREAKER_COOLDOWN_SECONDS = float(os.environ.get("BACKEND_BREAKER_COOLDOWN_SECONDS", "20"))
+BACKEND_HEDGE_DEFAULT_DELAY_SECONDS = float(os.environ.get("BACKEND_HEDGE_DEFAULT_DELAY_SECONDS", "1.5"))
+BACKEND_HEDGE_MIN_DELAY_SECONDS = float(os.environ.get("BACKEND_HEDGE_MIN_DELAY_SECONDS", "0.25"))
+
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+LATENCY_SAMPLES_PER_PATH = 200
+MIN_RETRY_BUDGET_SECONDS = 0.5
+
+
+class BackendUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = BACKEND_BREAKER_FAILURES, cooldown: float = BACKEND_BREAKER_COOLDOWN_SECONDS):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.opened = 0
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self):
+        self._consecutive = 0
+        self._probing = False
+        if self.state != "closed":
+            logger.info("Backend circuit closed")
+        self.state = "closed"
+
+    def release(self):
+        self._probing = False
+
+    def record_failure(self):
+        self._consecutive += 1
+        self._probing = False
+        if self.state == "half_open" or (self.state == "closed" and self._consecutive >= self.failures):
+            if self.state == "closed":
+                logger.warning(f"Backend circuit opened after {self._consecutive} consecutive failures")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            self.opened += 1
+
+
+class BackendClient:
+    def __init__(
+        self,
+        base_url: str = BACKEND_URL,
+        limit: int = BACKEND_POOL_LIMIT,
+        limit_per_host: int = BACKEND_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = BACKEND_KEEPALIVE_SECONDS,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._active = 0
+        self._requests = 0
+        self._connections_created = 0
+        self._connections_reused = 0
+        self._queued = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self.breaker = CircuitBreaker()
+        self._latencies: dict[str, deque] = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES_PER_PATH))
+        self._hedges_fired = 0
+        self._hedges_won = 0
+        self._retries = 0
+        self._short_circuited = 0
+        self._budget_exceeded = 0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_queued_start(session, ctx, params):
+            ctx.queued_at = time.perf_counter()
+
+        async def on_queued_end(session, ctx, params):
+            waited = time.perf_counter() - getattr(ctx, "queued_at", time.perf_counter())
+            self._queued += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        async def on_create_end(session, ctx, params):
+            self._connections_created += 1
+
+        async def on_reuse(session, ctx, params):
+            self._connections_reused += 1
+
+        trace.on_connection_queued_start.append(on_queued_start)
+        trace.on_connection_queued_end.append(on_queued_end)
+        trace.on_connection_create_end.append(on_create_end)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=BACKEND_DNS_CACHE_SECONDS,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=[self._trace_config()],
+            )
+            self._loop = loop
+        return self._session
+
+    @asynccontextmanager
+    async def post(self, path: str, json: dict, timeout: float):
+        session = self._get_session()
+        self._active += 1
+        self._requests += 1
+        try:
+            async with session.post(
+                f"{self.base_url}{path}",
+                json=json,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                yield resp
+        finally:
+            self._active -= 1
+
+    def hedge_delay(self, path: str) -> float:
+        samples = self._latencies[path]
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return BACKEND_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(BACKEND_HEDGE_MIN_DELAY_SECONDS, percentile(sorted(samples), HEDGE_PERCENTILE))
+
+    async def _attempt(self, path: str, json: dict, timeout: float) -> tuple[int, dict | None]:
+        start = time.perf_counter()
+        async with self.post(path, json=json, timeout=timeout) as resp:
+            try:
+                data = await resp.json()
+            except (aiohttp.ContentTypeError, ValueError):
+                data = None
+            status = resp.status
+        if status < 500:
+            self._latencies[path].append(time.perf_counter() - start)
+        return status, data
+
+    async def _hedged(self, path: str, json: dict, deadline: float) -> tuple[int, dict | None]:
+        loop = asyncio.get_running_loop()
+        primary = asyncio.create_task(self._attempt(path, json, deadline - loop.time()))
+        attempts = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay(path))
+            if done:
+                return primary.result()
+
+            self._hedges_fired += 1
+            hedge = asyncio.create_task(self._attempt(path, json, deadline - loop.time()))
+            attempts.append(hedge)
+            pending = {primary, hedge}
+            result = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result()[0] < 500:
+                        if task is hedge:
+                            self._hedges_won += 1
+                        return task.result()
+                    result = task
+            return result.result()
+        finally:
+            # Reap the losers (also when the caller's budget cancels us) so a
+            # failed attempt never logs "Task exception was never retrieved".
+            for task in attempts:
+                task.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+    async def request_json(
+        self,
+        path: str,
+        json: dict,
+        budget: float,
+        hedge: bool = False,
+        retries: int = 0,
+    ) -> tuple[int, dict | None]:
+        # Whole-call deadline: hedges and retries share one budget, and an open
+        # circuit fails immediately so callers can fall back to local logic.
+        if not self.breaker.allow():
+            self._short_circuited += 1
+            raise BackendUnavailable(f"circuit open for {path}")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget
+        error: Exception | None = None
+        try:
+            for attempt in range(retries + 1):
+                remaining = deadline - loop.time()
+                if attempt and remaining < MIN_RETRY_BUDGET_SECONDS:
+                    break
+                if attempt:
+                    self._retries += 1
+                try:
+                    if hedge:
+                        status, data = await asyncio.wait_for(self._hedged(path, json, deadline), timeout=remaining)
+                    else:
+                        status, data = await asyncio.wait_for(self._attempt(path, json, remaining), timeout=remaining)
+                except asyncio.TimeoutError:
+                    self._budget_exceeded += 1
+                    error = BackendUnavailable(f"{path} exceeded its {budget:g}s budget")
+                    break
+                except aiohttp.ClientError as e:
+                    error = e
+                    continue
+                if status >= 500:
+                    error = BackendUnavailable(f"{path} returned {status}")
+                    continue
+                self.breaker.record_success()
+                return status, data
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+
+        self.breaker.record_failure()
+        if isinstance(error, BackendUnavailable):
+            raise error
+        raise BackendUnavailable(f"{path} failed: {error!r}") from error
+
+    @asynccontextmanager
+    async def stream(self, path: str, json: dict, budget: float):
+        if not self.breaker.allow():
+            self._short_circuited += 1
+            raise BackendUnavailable(f"circuit open for {path}")
+        try:
+            async with self.post(path, json=json, timeout=budget) as resp:
+                if resp.status >= 500:
+                    raise BackendUnavailable(f"{path} returned {resp.status}")
+                yield resp
+        except (BackendUnavailable, aiohttp.ClientError, asyncio.TimeoutError):
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+
+    async def warm(self):
+        try:
+            session = self._get_session()
+            async with session.get(self.base_url, timeout=aiohttp.ClientTimeout(total=5)) as resp:
+                await resp.read()
+        except Exception as e:
+            logger.error(f"Backend warmup failed: {e}")
+
+    def stats(self) -> dict:
+        idle = 0
+        if self._session is not None and not self._session.closed:
+            conns = getattr(self._session.connector, "_conns", {}) or {}
+            idle = sum(len(v) for v in conns.values())
+        return {
+            "active": self._active,
+            "idle": idle,
+            "requests": self._requests,
+            "connections_created": self._connections_created,
+            "connections_reused": self._connections_reused,
+            "queued": self._queued,
+            "wait_avg_ms": round(self._wait_total / self._queued * 1000, 2) if self._queued else 0.0,
+            "wait_max_ms": round(self._wait_max * 1000, 2),
+            "hedges_fired": self._hedges_fired,
+            "hedges_won": self._hedges_won,
+            "retries": self._retries,
+            "budget_exceeded": self._budget_exceeded,
+            "short_circuited": self._short_circuited,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+_backend_client: BackendClient | None = None
+_backend_users = 0
+
+
+def get_backend_client() -> BackendClient:
+    global _backend_client
+    if _backend_client is None:
+        _backend_client = BackendClient()
+    return _backend_client
+
+
+def acquire_backend_client() -> BackendClient:
+    global _backend_users
+    _backend_users += 1
+    return get_backend_client()
+
+
+async def release_backend_client():
+    global _backend_users
+    _backend_users = max(0, _backend_users - 1)
+    if _backend_users == 0 and _backend_client is not None:
+        logger.info(f"Closing backend client, pool stats: {_backend_client.stats()}")
+        await _backend_client.close()
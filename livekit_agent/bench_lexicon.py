@@ -0,0 +1,186 @@
+import time
+
+from intent import classify_plan_reply, is_plan_offer
+from lexicon import extract_crop_location, get_lexicon
+
+TRANSCRIPTS = [
+    {
+        "language": "Hindi",
+        "messages": [
+            ("assistant", "नमस्ते! मैं खेतसाथी हूं, आपका AI फसल डॉक्टर। पहले अपना नाम बताइए?"),
+            ("user", "मेरा नाम रमेश है"),
+            ("assistant", "रमेश जी, आप कौन सी फसल उगा रहे हैं?"),
+            ("user", "टमाटर की खेती है भाई"),
+            ("assistant", "अच्छा, टमाटर! आपका खेत कहाँ है?"),
+            ("user", "नासिक जिले में"),
+        ],
+        "crop": "Tomato",
+        "location": "Nashik, Maharashtra",
+    },
+    {
+        "language": "Hindi",
+        "messages": [
+            ("user", "सुरेश"),
+            ("user", "गेहूँ लगाया है"),
+            ("user", "करनाल, हरियाणा"),
+        ],
+        "crop": "Wheat",
+        "location": "Karnal, Haryana",
+    },
+    {
+        "language": "Hindi",
+        "messages": [
+            ("user", "मेरा नाम सीता है"),
+            ("user", "धान और मक्का दोनों हैं"),
+            ("user", "पटना"),
+        ],
+        "crop": None,
+        "location": "Patna, Bihar",
+        "unsure": True,
+    },
+    {
+        "language": "Telugu",
+        "messages": [
+            ("assistant", "నమస్కారం! ముందుగా మీ పేరు చెప్పగలరా?"),
+            ("user", "నా పేరు రాము"),
+            ("assistant", "రాము గారు, మీరు ఏ పంట వేశారు?"),
+            ("user", "మిర్చి వేశాను"),
+            ("assistant", "మీ పొలం ఎక్కడ ఉంది?"),
+            ("user", "గుంటూరు జిల్లా"),
+        ],
+        "crop": "Chilli",
+        "location": "Guntur, Andhra Pradesh",
+    },
+    {
+        "language": "Telugu",
+        "messages": [
+            ("user", "లక్ష్మి"),
+            ("user", "మా పొలంలో టమాటాలు"),
+            ("user", "మా ఊరు వరంగల్"),
+        ],
+        "crop": "Tomato",
+        "location": "Warangal, Telangana",
+    },
+    {
+        "language": "Telugu",
+        "messages": [
+            ("user", "శ్రీను"),
+            ("user", "పత్తి"),
+            ("user", "మా గ్రామం చింతలపూడి"),
+        ],
+        "crop": "Cotton",
+        "location": None,
+        "unsure": True,
+    },
+    {
+        "language": "English",
+        "messages": [
+            ("user", "I am Ravi"),
+            ("user", "I grow paddy"),
+            ("user", "Near Nellore"),
+        ],
+        "crop": "Rice",
+        "location": "Nellore, Andhra Pradesh",
+    },
+    {
+        "language": "English",
+        "messages": [
+            ("user", "Kiran"),
+            ("user", "Sugar cane"),
+            ("user", "West Godavari district"),
+        ],
+        "crop": "Sugarcane",
+        "location": "West Godavari, Andhra Pradesh",
+    },
+    {
+        "language": "English",
+        "messages": [
+            ("user", "Anil here"),
+            ("user", "Papaya"),
+        ],
+        "crop": None,
+        "location": None,
+        "unsure": True,
+    },
+    {
+        "language": "English",
+        "messages": [
+            ("user", "Mahesh"),
+            ("user", "tamatar, in Indore"),
+        ],
+        "crop": "Tomato",
+        "location": "Indore, Madhya Pradesh",
+    },
+]
+
+PLAN_OFFERS = [
+    ("Would you like me to prepare a detailed 7-day treatment plan for you?", True),
+    ("क्या आप चाहेंगे कि मैं आपके लिए 7 दिन की पूरी उपचार योजना बनाऊं?", True),
+    ("మీ కోసం 7 రోజుల చికిత్స ప్రణాళిక తయారు చేయమంటారా?", True),
+    # A follow-up question that merely mentions the plan afterwards.
+    ("Have you sprayed any pesticide yet? After that I will make your treatment plan.", False),
+    ("क्या आपने कोई दवा छिड़की है? उसके बाद मैं आपकी उपचार योजना बनाऊंगा।", False),
+    ("Did it rain in the last 24 hours?", False),
+]
+
+PLAN_REPLIES = [
+    ("Yes please, make the plan", True),
+    ("हाँ जी, बना दीजिए", True),
+    ("అవును, చేయండి", True),
+    ("No, not now", False),
+    ("नहीं चाहिए", False),
+    ("I am not sure", None),
+    ("पता नहीं", None),
+    ("What will the plan cost?", None),
+]
+
+ITERATIONS = 2000
+
+
+def _as_messages(transcript: dict) -> list[dict]:
+    return [{"role": role, "content": content} for role, content in transcript["messages"]]
+
+
+def run():
+    start = time.perf_counter()
+    get_lexicon()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    correct = 0
+    for transcript in TRANSCRIPTS:
+        result = extract_crop_location(_as_messages(transcript))
+        ok = (
+            result.crop == transcript["crop"]
+            and result.location == transcript["location"]
+            and result.unsure == transcript.get("unsure", False)
+        )
+        correct += ok
+        status = "ok  " if ok else "MISS"
+        print(f"{status} [{transcript['language']}] crop={result.crop} location={result.location} unsure={result.unsure}")
+
+    intent_correct = 0
+    intent_cases = [("offer", is_plan_offer, PLAN_OFFERS), ("reply", classify_plan_reply, PLAN_REPLIES)]
+    for kind, classify, cases in intent_cases:
+        for text, expected in cases:
+            result = classify(text)
+            intent_correct += result == expected
+            if result != expected:
+                print(f"MISS {kind}={result} (expected {expected}) {text}")
+    intent_total = len(PLAN_OFFERS) + len(PLAN_REPLIES)
+
+    conversations = [_as_messages(t) for t in TRANSCRIPTS]
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for messages in conversations:
+            extract_crop_location(messages)
+    per_call_us = (time.perf_counter() - start) / (ITERATIONS * len(conversations)) * 1_000_000
+
+    print(f"\nLexicon load: {load_ms:.2f} ms")
+    print(f"Accuracy: {correct}/{len(TRANSCRIPTS)} ({correct / len(TRANSCRIPTS):.0%})")
+    print(f"Plan offer/reply cases: {intent_correct}/{intent_total}")
+    print(f"Extraction: {per_call_us:.1f} us per conversation")
+    return correct == len(TRANSCRIPTS) and intent_correct == intent_total
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if run() else 1)
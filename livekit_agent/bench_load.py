@@ -0,0 +1,540 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import shutil
+import socket
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from types import SimpleNamespace
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Module-level settings are read at import time, so point the agent at the
+# local stand-in and throwaway cache directories before importing it.
+PORT = _free_port()
+TTS_CACHE_DIR = tempfile.mkdtemp(prefix="khetsaathi-bench-tts-")
+os.environ["BACKEND_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ["TTS_AUDIO_CACHE_DIR"] = TTS_CACHE_DIR
+os.environ["DIAGNOSIS_CACHE_DIR"] = ""
+# Each voice job runs in its own process with its own connection pool; with
+# every session sharing one pool here, its per-host limit would be the thing
+# measured. Set these explicitly to study pool contention.
+os.environ.setdefault("BACKEND_POOL_LIMIT", "0")
+os.environ.setdefault("BACKEND_POOL_LIMIT_PER_HOST", "0")
+
+from aiohttp import web  # noqa: E402
+from livekit import rtc  # noqa: E402
+
+import llm_stream  # noqa: E402
+from agent import PLAN_DONE_PROMPT, KhetSaathiAgent  # noqa: E402
+from audio_cache import FRAME_MS  # noqa: E402
+from backend_client import acquire_backend_client, release_backend_client  # noqa: E402
+from intent import classify_plan_reply  # noqa: E402
+from lexicon import extract_crop_location, match_turn  # noqa: E402
+from tracing import TurnTracer, format_summary, get_latency_recorder, percentile  # noqa: E402
+
+logging.getLogger("khetsaathi-agent").setLevel(logging.WARNING)
+
+BACKEND_LATENCY = {
+    "extract": 0.8,
+    "diagnose": 3.0,
+    "detect-plan-intent": 0.8,
+    "generate-plan": 5.0,
+}
+
+DIALOGUES = [
+    {
+        "language": "English",
+        "turns": [
+            ("My name is Ramesh", "Nice to meet you, Ramesh. Which crop are you growing?"),
+            ("Tomato", "Ah, tomatoes! Good crop. Where is your farm?"),
+            ("My farm is in Nashik district", "How long ago did you plant the tomatoes?"),
+            ("About forty days back", "Has it rained in the last day?"),
+        ],
+        "follow_up": ("No fertilizer yet", "Would you like me to prepare a detailed 7-day treatment plan for you?"),
+        "accept": ("Yes please, make the plan", "Very good, I am preparing your plan!"),
+    },
+    {
+        "language": "Hindi",
+        "turns": [
+            ("मेरा नाम रमेश है", "रमेश जी, आप कौन सी फसल उगा रहे हैं?"),
+            ("टमाटर की खेती है", "अच्छा, टमाटर! आपका खेत कहाँ है?"),
+            ("नासिक जिले में", "फसल कितने दिन पहले लगाई थी?"),
+            ("चालीस दिन पहले", "खेत का कितना हिस्सा खराब हुआ है?"),
+        ],
+        "follow_up": ("अभी तक कोई खाद नहीं डाली", "क्या आप चाहेंगे कि मैं आपके लिए 7 दिन की पूरी उपचार योजना बनाऊं?"),
+        "accept": ("हाँ जी, बना दीजिए", "बहुत अच्छा, मैं आपकी योजना तैयार कर रहा हूँ!"),
+    },
+    {
+        "language": "Telugu",
+        "turns": [
+            ("నా పేరు రాము", "రాము గారు, మీరు ఏ పంట వేశారు?"),
+            ("మిర్చి వేశాను", "మీ పొలం ఎక్కడ ఉంది?"),
+            ("గుంటూరు జిల్లా", "పంట వేసి ఎన్ని రోజులు అయింది?"),
+            ("నలభై రోజులు", "పొలంలో ఎంత భాగం దెబ్బతింది?"),
+        ],
+        "follow_up": ("ఇంకా ఎరువు వేయలేదు", "మీ కోసం 7 రోజుల చికిత్స ప్రణాళిక తయారు చేయమంటారా?"),
+        "accept": ("అవును, చేయండి", "చాలా మంచిది, మీ ప్రణాళిక తయారు చేస్తున్నాను!"),
+    },
+    {
+        # Two crops in one answer: the local lexicon is unsure, so this
+        # dialogue exercises the remote /extract path.
+        "language": "Hindi",
+        "turns": [
+            ("मेरा नाम सीता है", "सीता जी, आप कौन सी फसल उगा रही हैं?"),
+            ("धान और मक्का दोनों हैं, ज़्यादातर धान", "अच्छा! आपका खेत कहाँ है?"),
+            ("पटना जिले में", "फसल कितने दिन पहले लगाई थी?"),
+            ("दो महीने हो गए", "खेत का कितना हिस्सा खराब हुआ है?"),
+        ],
+        "follow_up": ("यूरिया डाला था पिछले हफ्ते", "क्या आप चाहेंगे कि मैं आपके लिए 7 दिन की पूरी उपचार योजना बनाऊं?"),
+        "accept": ("हाँ जी, बना दीजिए", "बहुत अच्छा, मैं आपकी योजना तैयार कर रहा हूँ!"),
+    },
+]
+
+DIAGNOSIS_MESSAGES = {
+    "English": "Your crop has leaf blight. Spray Mancozeb this week and remove the infected leaves. Don't worry, we can treat this together.",
+    "Hindi": "आपकी फसल में झुलसा रोग है। इस हफ्ते मैनकोज़ेब का छिड़काव करें और बीमार पत्तियाँ हटा दें। चिंता मत करिए, हम मिलकर इलाज करेंगे।",
+    "Telugu": "మీ పంటకు ఆకు ఎండు తెగులు వచ్చింది. ఈ వారం మాంకోజెబ్ పిచికారీ చేసి, తెగులు ఆకులు తీసేయండి. చింతించకండి, మనం కలిసి నయం చేద్దాం.",
+}
+
+PLAN_SECTIONS = [
+    "Diagnosis Summary",
+    "Immediate Actions (Day 1-2)",
+    "Prescription",
+    "7-Day Action Calendar",
+    "Budget Estimate (per acre)",
+    "Safety Rules",
+    "Prevention for Future",
+]
+
+PLAN_SUMMARIES = {
+    "English": "Your 7-day plan is ready. Start with a Mancozeb spray tomorrow morning.",
+    "Hindi": "आपकी 7 दिन की योजना तैयार है। कल सुबह मैनकोज़ेब के छिड़काव से शुरुआत करें।",
+    "Telugu": "మీ 7 రోజుల ప్రణాళిక సిద్ధంగా ఉంది. రేపు ఉదయం మాంకోజెబ్ పిచికారీతో మొదలుపెట్టండి.",
+}
+
+
+class ConversationOutOfSync(Exception):
+    def __init__(self, seq: int):
+        super().__init__("Conversation state out of sync")
+        self.seq = seq
+
+
+class BackendStandIn:
+    def __init__(self, latency: dict[str, float]):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._sessions: dict[str, dict] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self._health)
+        app.router.add_post("/api/chat/extract", lambda r: self._conversation(r, "extract", self._extract))
+        app.router.add_post("/api/chat/diagnose", self._diagnose)
+        app.router.add_post("/api/chat/detect-plan-intent", lambda r: self._conversation(r, "detect-plan-intent", self._plan_intent))
+        app.router.add_post("/api/chat/generate-plan", self._generate_plan)
+        return app
+
+    async def _delay(self, name: str):
+        self.calls[name] += 1
+        await asyncio.sleep(self.latency.get(name, 0))
+
+    def _resolve(self, body: dict) -> tuple[list[dict], int | None]:
+        # Mirrors server/services/conversationSyncService.ts.
+        plain = [{"role": m["role"], "content": m["content"]} for m in body.get("messages", [])]
+        session_id = body.get("sessionId")
+        if not session_id:
+            return plain, None
+        session = self._sessions.get(session_id)
+        base_seq = body.get("baseSeq") or 0
+        if body.get("reset") or (session is None and base_seq == 0):
+            session = {"seq": 0, "messages": []}
+            if body.get("summary"):
+                session["messages"].append({"role": "user", "content": f"[Summary of the earlier conversation]\n{body['summary']}"})
+            self._sessions[session_id] = session
+        elif session is None or base_seq > session["seq"]:
+            raise ConversationOutOfSync(session["seq"] if session else 0)
+        for message in body.get("messages", []):
+            seq = message.get("seq")
+            if seq is not None and seq <= session["seq"]:
+                continue
+            session["messages"].append({"role": message["role"], "content": message["content"]})
+            session["seq"] = seq if seq is not None else session["seq"] + 1
+        return session["messages"], session["seq"]
+
+    async def _conversation(self, request: web.Request, name: str, respond) -> web.Response:
+        body = await request.json()
+        try:
+            messages, seq = self._resolve(body)
+        except ConversationOutOfSync as e:
+            self.calls[name] += 1
+            return web.json_response({"message": str(e), "seq": e.seq}, status=409)
+        await self._delay(name)
+        return web.json_response({**respond(messages, body), "seq": seq})
+
+    async def _health(self, request: web.Request) -> web.Response:
+        return web.json_response({"ok": True})
+
+    def _extract(self, messages: list[dict], body: dict) -> dict:
+        # Stands in for the LLM: takes the first crop the farmer named when
+        # the lexicon alone cannot decide.
+        local = extract_crop_location(messages)
+        crops = [c for m in messages if m["role"] == "user" for c in match_turn(m["content"]).crops]
+        return {"crop": local.crop or (crops[0] if crops else ""), "location": local.location or ""}
+
+    async def _diagnose(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self._delay("diagnose")
+        return web.json_response({
+            "success": True,
+            "diagnosis": {
+                "disease": "Leaf Blight",
+                "crop": body.get("crop", ""),
+                "severity": "moderate",
+                "recommended_pesticide": "Mancozeb 75% WP",
+                "immediate_action": "Remove and burn the infected leaves",
+            },
+        })
+
+    def _plan_intent(self, messages: list[dict], body: dict) -> dict:
+        last_user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        return {"wantsPlan": classify_plan_reply(last_user) is True}
+
+    def _plan(self, messages: list[dict], body: dict) -> dict:
+        language = body.get("language", "English")
+        return {"plan": {}, "pdfUrl": "", "planSummaryMessage": PLAN_SUMMARIES.get(language, PLAN_SUMMARIES["English"])}
+
+    async def _generate_plan(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        if not body.get("stream"):
+            return await self._conversation(request, "generate-plan", self._plan)
+        try:
+            messages, seq = self._resolve(body)
+        except ConversationOutOfSync as e:
+            self.calls["generate-plan"] += 1
+            return web.json_response({"message": str(e), "seq": e.seq}, status=409)
+        self.calls["generate-plan"] += 1
+
+        resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await resp.prepare(request)
+        step = self.latency.get("generate-plan", 0) / (len(PLAN_SECTIONS) + 1)
+        for index, title in enumerate(PLAN_SECTIONS):
+            await asyncio.sleep(step)
+            event = {"type": "section", "index": index, "title": title, "content": f"- Step for {title.lower()}"}
+            await resp.write((json.dumps(event) + "\n").encode("utf-8"))
+        await asyncio.sleep(step)
+        done = {"type": "done", "sections": len(PLAN_SECTIONS), "pdfUrl": "", "seq": seq, **self._plan(messages, body)}
+        done.pop("plan")
+        await resp.write((json.dumps(done, ensure_ascii=False) + "\n").encode("utf-8"))
+        await resp.write_eof()
+        return resp
+
+
+class FakeTTS:
+    sample_rate = 24000
+    num_channels = 1
+
+    def __init__(self, ttfb: float):
+        self.ttfb = ttfb
+
+    def synthesize(self, text: str):
+        return _FakeSynthesis(self, text)
+
+
+class _FakeSynthesis:
+    def __init__(self, tts: FakeTTS, text: str):
+        self._tts = tts
+        self._text = text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        await asyncio.sleep(self._tts.ttfb)
+        samples = self._tts.sample_rate * FRAME_MS // 1000
+        silence = bytes(samples * self._tts.num_channels * 2)
+        # Roughly 12 characters of speech per 20 ms frame keeps files small.
+        for _ in range(max(1, len(self._text) // 12)):
+            frame = rtc.AudioFrame(
+                data=silence,
+                sample_rate=self._tts.sample_rate,
+                num_channels=self._tts.num_channels,
+                samples_per_channel=samples,
+            )
+            yield SimpleNamespace(frame=frame)
+
+
+def fake_text_chunks(ttft: float, chunk_gap: float):
+    async def text_chunks(prompt: str, model: str):
+        language = next((lang for lang in DIAGNOSIS_MESSAGES if f"in {lang} for" in prompt), "English")
+        await asyncio.sleep(ttft)
+        for word in DIAGNOSIS_MESSAGES[language].split(" "):
+            yield word + " "
+            await asyncio.sleep(chunk_gap)
+
+    return text_chunks
+
+
+class FakeSession:
+    def __init__(self, tts: FakeTTS, chunk_gap: float):
+        self.tts = tts
+        self.chunk_gap = chunk_gap
+        self.utterances: list[str] = []
+        self._playing: set[asyncio.Task] = set()
+        self._changed = asyncio.Event()
+
+    def say(self, text, audio=None, add_to_chat_ctx=True):
+        first_audio = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(self._play(text, audio, first_audio))
+        self._playing.add(task)
+        task.add_done_callback(self._finished)
+        return SimpleNamespace(first_audio=first_audio)
+
+    def _finished(self, task: asyncio.Task):
+        self._playing.discard(task)
+        self._changed.set()
+
+    async def _play(self, text, audio, first_audio: asyncio.Future):
+        def started():
+            if not first_audio.done():
+                first_audio.set_result(time.perf_counter())
+
+        if audio is not None:
+            async for _ in audio:
+                started()
+        if isinstance(text, str):
+            if audio is None:
+                await asyncio.sleep(self.tts.ttfb)
+            started()
+            self.utterances.append(text)
+            return
+        parts = []
+        async for sentence in text:
+            if not parts:
+                await asyncio.sleep(self.tts.ttfb)
+                started()
+            parts.append(sentence)
+            await asyncio.sleep(self.chunk_gap)
+        started()
+        self.utterances.append("".join(parts))
+
+    async def wait_until(self, predicate, timeout: float):
+        async def wait():
+            while not predicate():
+                self._changed.clear()
+                await self._changed.wait()
+
+        await asyncio.wait_for(wait(), timeout)
+
+    @property
+    def idle(self) -> bool:
+        return not self._playing
+
+    async def aclose(self):
+        for task in list(self._playing):
+            task.cancel()
+        await asyncio.gather(*self._playing, return_exceptions=True)
+
+
+class BenchAgent(KhetSaathiAgent):
+    def __init__(self, session: FakeSession, **kwargs):
+        self._bench_session = session
+        self.bench_instructions = ""
+        super().__init__(**kwargs)
+
+    @property
+    def session(self):
+        return self._bench_session
+
+    async def update_instructions(self, instructions: str):
+        self.bench_instructions = instructions
+
+
+async def _user_turn(agent: BenchAgent, session: FakeSession, tracer: TurnTracer, text: str, reply: str, args) -> float:
+    ended = time.perf_counter()
+    await asyncio.sleep(args.stt_delay)
+
+    hook_start = time.perf_counter()
+    await agent.on_user_turn_completed(None, SimpleNamespace(content=text))
+    tracer.turn = agent.message_count
+    tracer.record("turn_hook", (time.perf_counter() - hook_start) * 1000)
+
+    await asyncio.sleep(args.llm_ttft)
+    handle = session.say(reply)
+    agent.record_assistant_message(reply)
+    first_audio = await handle.first_audio
+    tracer.record("turn_first_audio", (first_audio - ended) * 1000)
+    await session.wait_until(lambda: session.idle, args.timeout)
+    return ended
+
+
+async def run_session(index: int, args, load: dict) -> dict:
+    dialogue = DIALOGUES[index % len(DIALOGUES)]
+    language = dialogue["language"]
+    image_urls = [f"https://bench.invalid/{'shared' if args.shared_images else index}/leaf.jpg"]
+    session = FakeSession(FakeTTS(args.tts_ttfb), args.chunk_gap)
+    agent = BenchAgent(session, language=language, image_urls=image_urls, phone=f"+9100000{index:05d}")
+    tracer = TurnTracer(f"bench-{index}", language)
+    plan_instructions = PLAN_DONE_PROMPT.replace("{LANGUAGE}", language)
+
+    load["active"] += 1
+    load["peak"] = max(load["peak"], load["active"])
+    started = time.perf_counter()
+    ok = False
+    try:
+        await agent.on_enter()
+        await session.wait_until(lambda: session.idle, args.timeout)
+
+        for text, reply in dialogue["turns"]:
+            await _user_turn(agent, session, tracer, text, reply, args)
+
+        await session.wait_until(
+            lambda: agent.diagnosis is not None and not agent.diagnosis_in_progress and session.idle,
+            args.timeout,
+        )
+        tracer.phase = "diagnosis"
+        tracer.record("diagnosis_spoken", (time.perf_counter() - started) * 1000)
+
+        await _user_turn(agent, session, tracer, *dialogue["follow_up"], args)
+        accepted = await _user_turn(agent, session, tracer, *dialogue["accept"], args)
+        plan_summary = PLAN_SUMMARIES.get(language, PLAN_SUMMARIES["English"])
+        await session.wait_until(
+            lambda: agent.bench_instructions == plan_instructions and plan_summary in session.utterances and session.idle,
+            args.timeout,
+        )
+        tracer.phase = "plan"
+        tracer.record("plan_spoken", (time.perf_counter() - accepted) * 1000)
+        ok = True
+    except asyncio.TimeoutError:
+        logging.warning(f"Session {index} ({language}) stalled: diagnosis={agent.diagnosis is not None} plan={agent.plan_generated}")
+    finally:
+        load["active"] -= 1
+        await session.aclose()
+        stats = agent.stats()
+        await agent.on_exit()
+    return {"ok": ok, "language": language, "seconds": time.perf_counter() - started, "stats": stats}
+
+
+async def _monitor_loop(lags: list[float], stop: asyncio.Event, interval: float = 0.05):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+def _memory_bytes(traced: bool) -> int:
+    if traced:
+        return tracemalloc.get_traced_memory()[1]
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _parse_latency(spec: str) -> dict[str, float]:
+    latency = dict(BACKEND_LATENCY)
+    for item in filter(None, spec.split(",")):
+        name, _, seconds = item.partition("=")
+        if name not in latency:
+            raise SystemExit(f"unknown endpoint {name!r}, expected one of {', '.join(latency)}")
+        latency[name] = float(seconds)
+    return latency
+
+
+def _sum_stats(results: list[dict], section: str) -> dict:
+    total: Counter = Counter()
+    for result in results:
+        total.update(result["stats"][section])
+    return dict(total)
+
+
+async def run(args) -> int:
+    llm_stream._text_chunks = fake_text_chunks(args.llm_ttft, args.chunk_gap)
+    stand_in = BackendStandIn(_parse_latency(args.latency))
+    runner = web.AppRunner(stand_in.app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+    backend = acquire_backend_client()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    baseline = _memory_bytes(args.tracemalloc)
+    if args.tracemalloc:
+        tracemalloc.reset_peak()
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop(lags, stop))
+    semaphore = asyncio.Semaphore(args.concurrency)
+    load = {"active": 0, "peak": 0}
+
+    async def one(index: int) -> dict:
+        await asyncio.sleep(index * args.ramp)
+        async with semaphore:
+            return await run_session(index, args, load)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await monitor
+    memory = _memory_bytes(args.tracemalloc) - baseline
+    pool = backend.stats()
+    await release_backend_client()
+    await runner.cleanup()
+    shutil.rmtree(TTS_CACHE_DIR, ignore_errors=True)
+
+    completed = [r for r in results if r["ok"]]
+    failed = len(results) - len(completed)
+    lags.sort()
+    per_session = max(len(results), 1)
+
+    print(f"Sessions: {len(completed)} ok, {failed} failed in {elapsed:.2f} s "
+          f"({len(completed) / elapsed:.2f} sessions/s, peak {load['peak']} concurrent)")
+    print(f"Event-loop lag: p50 {percentile(lags, 50):.1f} ms  p95 {percentile(lags, 95):.1f} ms  "
+          f"p99 {percentile(lags, 99):.1f} ms  max {lags[-1] if lags else 0.0:.1f} ms")
+    print(f"Memory: {memory / max(load['peak'], 1) / 1024:.1f} KiB per concurrent session "
+          f"({'tracemalloc peak' if args.tracemalloc else 'max RSS'} delta {memory / 2 ** 20:.1f} MiB)")
+    calls = ", ".join(f"{name} {stand_in.calls[name] / per_session:.2f}" for name in BACKEND_LATENCY)
+    print(f"Backend calls per session: {calls}")
+    print(f"Backend pool: {pool}")
+    print(f"Extraction: {_sum_stats(results, 'extraction')}  plan intent: {_sum_stats(results, 'plan_intent')}  "
+          f"speculative diagnosis: {_sum_stats(results, 'speculative_diagnosis')}")
+    print()
+    print(format_summary(get_latency_recorder().summary()))
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test: N concurrent KhetSaathiAgent sessions against a local backend stand-in")
+    parser.add_argument("--sessions", type=int, default=50, help="total sessions to run")
+    parser.add_argument("--concurrency", type=int, default=50, help="sessions alive at once")
+    parser.add_argument("--ramp", type=float, default=0.0, help="seconds between session starts")
+    parser.add_argument("--latency", default="", help="backend latency overrides in seconds, e.g. diagnose=2,generate-plan=4")
+    parser.add_argument("--stt-delay", type=float, default=0.3, help="end of speech to final transcript")
+    parser.add_argument("--llm-ttft", type=float, default=0.5, help="LLM time to first token")
+    parser.add_argument("--tts-ttfb", type=float, default=0.25, help="TTS time to first audio")
+    parser.add_argument("--chunk-gap", type=float, default=0.02, help="gap between streamed LLM chunks and TTS sentences")
+    parser.add_argument("--shared-images", action="store_true", help="give every session the same photos to exercise the diagnosis cache")
+    parser.add_argument("--tracemalloc", action="store_true", help="measure Python heap instead of RSS (slower)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds a session may wait for any one step")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
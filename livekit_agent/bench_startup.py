@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import logging
+import re
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+
+from livekit.plugins import google, silero
+
+import audio_cache
+from bench_load import TTS_CACHE_DIR, BenchAgent, FakeSession, FakeTTS
+from agent import LANGUAGE_MAP, LLM_MODEL, TTS_MODEL, TTS_PACE, TTS_SPEAKER, build_stt, build_tts, prewarm
+from tracing import percentile
+
+STARTUP_LINE = re.compile(r"Startup: job assigned to first greeting audio in (\d+) ms \(prewarmed=(\w+)\)")
+
+
+def _timed(name: str, build, timings: dict, failures: list[str]):
+    start = time.perf_counter()
+    try:
+        build()
+    except Exception as e:
+        # Without SARVAM_API_KEY / GOOGLE_API_KEY the plugin constructors raise;
+        # the other components are still worth timing.
+        failures.append(f"{name}: {e}")
+    timings[name] = (time.perf_counter() - start) * 1000
+
+
+def _bind(userdata: dict, language: str, failures: list[str]) -> dict:
+    # Mirrors agent.bind_plugins one component at a time, so VAD loading is
+    # timed apart from the Sarvam and Google constructors.
+    timings = {"speech": 0.0, "llm": 0.0, "vad": 0.0}
+    if userdata.get("plugins", {}).get(language) is None:
+        _timed("speech", lambda: (build_stt(language), build_tts(language)), timings, failures)
+    if userdata.get("llm") is None:
+        _timed("llm", lambda: google.LLM(model=LLM_MODEL), timings, failures)
+    if userdata.get("vad") is None:
+        _timed("vad", silero.VAD.load, timings, failures)
+    return timings
+
+
+def _fresh_audio_cache(directory: str):
+    # Each mode starts with an empty greeting cache, so the comparison shows
+    # what prewarm saves rather than what earlier jobs put in the cache.
+    audio_cache._audio_caches.clear()
+    audio_cache._audio_caches[(TTS_SPEAKER, TTS_PACE, TTS_MODEL)] = audio_cache.AudioCache(
+        voice=TTS_SPEAKER, pace=TTS_PACE, model=TTS_MODEL, directory=directory
+    )
+
+
+async def _job(index: int, userdata: dict, language: str, args, failures: list[str]) -> dict:
+    assigned = time.perf_counter()
+    bind = _bind(userdata, language, failures)
+
+    session = FakeSession(FakeTTS(args.tts_ttfb), chunk_gap=0.0)
+    said = session.say
+    first_say: list = []
+
+    def say(text, audio=None, add_to_chat_ctx=True):
+        handle = said(text, audio=audio, add_to_chat_ctx=add_to_chat_ctx)
+        first_say.append(handle)
+        return handle
+
+    session.say = say
+    agent = BenchAgent(session, language=language, image_urls=[], phone=f"+9100000{index:05d}")
+    await agent.on_enter()
+    first_audio = await first_say[0].first_audio
+    greeting_ms = (first_audio - assigned) * 1000
+
+    await session.wait_until(lambda: session.idle, args.timeout)
+    await agent.on_exit()
+    await session.aclose()
+    return {**bind, "bind": sum(bind.values()), "greeting": greeting_ms}
+
+
+def _row(label: str, values: list[float]) -> str:
+    values = sorted(values)
+    return f"{label:<28}{len(values):>6}{percentile(values, 50):>10.1f}ms{percentile(values, 95):>10.1f}ms{values[-1]:>10.1f}ms"
+
+
+async def _mode(userdata_for_job, languages: list[str], args, failures: list[str]) -> list[dict]:
+    directory = tempfile.mkdtemp(prefix="khetsaathi-bench-startup-", dir=TTS_CACHE_DIR)
+    _fresh_audio_cache(directory)
+    return [await _job(i, userdata_for_job(), languages[i % len(languages)], args, failures) for i in range(args.jobs)]
+
+
+async def simulate(args):
+    languages = list(LANGUAGE_MAP)
+    failures: list[str] = []
+
+    # Cold: every job builds its own plugins, as a worker without prewarm does.
+    cold = await _mode(dict, languages, args, failures)
+
+    userdata: dict = {}
+    start = time.perf_counter()
+    prewarm(SimpleNamespace(userdata=userdata))
+    prewarm_ms = (time.perf_counter() - start) * 1000
+    warm = await _mode(lambda: userdata, languages, args, failures)
+    shutil.rmtree(TTS_CACHE_DIR, ignore_errors=True)
+
+    print(f"Simulated job assignment to first greeting audio (TTS first byte {args.tts_ttfb * 1000:.0f} ms)")
+    print(f"Prewarm (once per process): {prewarm_ms:.1f} ms\n")
+    print(f"{'stage':<28}{'count':>6}{'p50':>12}{'p95':>12}{'max':>12}")
+    for label, jobs in (("cold", cold), ("prewarmed", warm)):
+        for component in ("speech", "llm", "vad", "bind"):
+            print(_row(f"{label} {component if component != 'bind' else 'binding total'}", [j[component] for j in jobs]))
+        print(_row(f"{label} first greeting", [j["greeting"] for j in jobs]))
+    if failures:
+        print(f"\nPlugin construction failed {len(failures)} times, so speech/llm times are not representative: {failures[0]}")
+
+
+def report_log(path: str):
+    samples: dict[str, list[float]] = {}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = STARTUP_LINE.search(line)
+            if match:
+                samples.setdefault(f"prewarmed={match.group(2)}", []).append(float(match.group(1)))
+    if not samples:
+        raise SystemExit(f"no 'Startup:' lines in {path}")
+    print(f"Worker job assignment to first greeting audio from {path}\n")
+    print(f"{'stage':<28}{'count':>6}{'p50':>12}{'p95':>12}{'max':>12}")
+    for label, values in sorted(samples.items()):
+        print(_row(label, values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time from job assignment to the first greeting audio, cold vs prewarmed")
+    parser.add_argument("--jobs", type=int, default=6, help="jobs to simulate per mode")
+    parser.add_argument("--tts-ttfb", type=float, default=0.25, help="TTS time to first audio for an uncached greeting")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for a greeting to finish")
+    parser.add_argument("--log", default="", help="summarize the worker's 'Startup:' log lines instead of simulating")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.log:
+        report_log(args.log)
+    else:
+        asyncio.run(simulate(args))
+
+
+if __name__ == "__main__":
+    main()
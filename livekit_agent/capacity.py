@@ -0,0 +1,240 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psutil
+
+from backend_client import get_backend_client
+from tracing import percentile
+
+logger = logging.getLogger("khetsaathi-agent")
+
+WORKER_MAX_SESSIONS = int(os.environ.get("WORKER_MAX_SESSIONS", "25"))
+WORKER_MAX_LOOP_LAG_MS = float(os.environ.get("WORKER_MAX_LOOP_LAG_MS", "250"))
+WORKER_MAX_BACKEND_IN_FLIGHT = int(os.environ.get("WORKER_MAX_BACKEND_IN_FLIGHT", "80"))
+WORKER_LOAD_THRESHOLD = float(os.environ.get("WORKER_LOAD_THRESHOLD", "0.75"))
+CAPACITY_DIR = os.environ.get("CAPACITY_DIR", os.path.join(tempfile.gettempdir(), "khetsaathi-capacity"))
+CAPACITY_METRICS_PORT = int(os.environ.get("CAPACITY_METRICS_PORT", "0"))
+
+LAG_PROBE_SECONDS = 0.25
+LAG_WINDOW = 40
+REPORT_INTERVAL_SECONDS = 1.0
+REPORT_STALE_SECONDS = 5.0
+REPORT_EXPIRE_SECONDS = 60.0
+
+
+class ProcessLoadReporter:
+    # Jobs run in separate processes, so each one publishes its own loop lag and
+    # backend pressure to a small file that the worker's load_fnc aggregates.
+    def __init__(self, directory: str = CAPACITY_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}.json")
+        self.sessions = 0
+        self._lags: deque[float] = deque(maxlen=LAG_WINDOW)
+        self._task: asyncio.Task | None = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def session_started(self):
+        self.sessions += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._write()
+
+    async def session_ended(self):
+        self.sessions = max(0, self.sessions - 1)
+        self._write()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        last_write = loop.time()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_PROBE_SECONDS)
+            now = loop.time()
+            self._lags.append(max(0.0, (now - start - LAG_PROBE_SECONDS) * 1000))
+            if now - last_write >= REPORT_INTERVAL_SECONDS:
+                self._write()
+                last_write = now
+
+    def snapshot(self) -> dict:
+        backend = get_backend_client().stats()
+        return {
+            "pid": os.getpid(),
+            "ts": round(time.time(), 3),
+            "sessions": self.sessions,
+            "loop_lag_ms": round(percentile(sorted(self._lags), 95), 1),
+            "backend_in_flight": backend["active"],
+            "backend_queued": backend["queued"],
+        }
+
+    def _write(self):
+        try:
+            with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(f"{self.path}.tmp", self.path)
+        except OSError as e:
+            logger.error(f"Load report write error: {e}")
+
+
+_reporter: ProcessLoadReporter | None = None
+
+
+def get_load_reporter() -> ProcessLoadReporter:
+    global _reporter
+    if _reporter is None:
+        _reporter = ProcessLoadReporter()
+    return _reporter
+
+
+class WorkerLoadModel:
+    def __init__(
+        self,
+        directory: str = CAPACITY_DIR,
+        max_sessions: int = WORKER_MAX_SESSIONS,
+        max_loop_lag_ms: float = WORKER_MAX_LOOP_LAG_MS,
+        max_backend_in_flight: int = WORKER_MAX_BACKEND_IN_FLIGHT,
+        threshold: float = WORKER_LOAD_THRESHOLD,
+    ):
+        self.directory = directory
+        self.max_sessions = max_sessions
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.max_backend_in_flight = max_backend_in_flight
+        self.threshold = threshold
+        self.accepted = 0
+        self.rejected = 0
+        self.last: dict = {}
+        self._worker = None
+        self._metrics_started = False
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _read_reports(self) -> list[dict]:
+        reports = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                age = now - os.path.getmtime(path)
+                if age > REPORT_EXPIRE_SECONDS:
+                    os.remove(path)
+                    continue
+                if age > REPORT_STALE_SECONDS:
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    reports.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return reports
+
+    def measure(self, worker=None) -> dict:
+        worker = worker or self._worker
+        reports = self._read_reports()
+        active_jobs = getattr(worker, "active_jobs", None)
+        sessions = len(active_jobs) if active_jobs is not None else sum(r.get("sessions", 0) for r in reports)
+        loop_lag_ms = max((r.get("loop_lag_ms", 0.0) for r in reports), default=0.0)
+        backend_in_flight = sum(r.get("backend_in_flight", 0) for r in reports)
+        cpu = psutil.cpu_percent() / 100
+
+        components = {
+            "sessions": sessions / self.max_sessions if self.max_sessions else 0.0,
+            "loop_lag": loop_lag_ms / self.max_loop_lag_ms if self.max_loop_lag_ms else 0.0,
+            "backend": backend_in_flight / self.max_backend_in_flight if self.max_backend_in_flight else 0.0,
+            "cpu": cpu,
+        }
+        score = min(1.0, max(components.values()))
+        self.last = {
+            "score": round(score, 3),
+            "threshold": self.threshold,
+            "sessions": sessions,
+            "loop_lag_ms": loop_lag_ms,
+            "backend_in_flight": backend_in_flight,
+            "cpu": round(cpu, 3),
+            "processes": len(reports),
+            "limiting": max(components, key=components.get),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+        }
+        return self.last
+
+    def load(self, worker=None) -> float:
+        if worker is not None:
+            self._worker = worker
+        if CAPACITY_METRICS_PORT:
+            self.serve_metrics(CAPACITY_METRICS_PORT)
+        return self.measure(worker)["score"]
+
+    def admit(self) -> bool:
+        snapshot = self.measure()
+        if snapshot["score"] >= self.threshold:
+            self.rejected += 1
+            logger.warning(f"Refusing job at load {snapshot['score']:.2f} (limited by {snapshot['limiting']}): {snapshot}")
+            return False
+        self.accepted += 1
+        return True
+
+    def prometheus(self) -> str:
+        snapshot = self.last or self.measure()
+        gauges = {
+            "khetsaathi_worker_load": snapshot["score"],
+            "khetsaathi_worker_load_threshold": snapshot["threshold"],
+            "khetsaathi_worker_sessions": snapshot["sessions"],
+            "khetsaathi_worker_loop_lag_ms": snapshot["loop_lag_ms"],
+            "khetsaathi_worker_backend_in_flight": snapshot["backend_in_flight"],
+            "khetsaathi_worker_cpu": snapshot["cpu"],
+        }
+        lines = []
+        for name, value in gauges.items():
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        for name, value in (("khetsaathi_worker_jobs_accepted_total", self.accepted), ("khetsaathi_worker_jobs_rejected_total", self.rejected)):
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int):
+        if self._metrics_started:
+            return
+        self._metrics_started = True
+        model = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = model.prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+                elif self.path == "/capacity":
+                    body, content_type = json.dumps(model.last or model.measure()).encode("utf-8"), "application/json"
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        except OSError as e:
+            logger.error(f"Capacity metrics server failed to start on port {port}: {e}")
+            return
+        threading.Thread(target=server.serve_forever, name="capacity-metrics", daemon=True).start()
+        logger.info(f"Serving worker capacity metrics on :{port}/metrics")
+
+
+_load_model: WorkerLoadModel | None = None
+
+
+def get_worker_load_model() -> WorkerLoadModel:
+    global _load_model
+    if _load_model is None:
+        _load_model = WorkerLoadModel()
+    return _load_model
@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger("khetsaathi-agent")
+
+DIAGNOSIS_CACHE_MAX_ENTRIES = int(os.environ.get("DIAGNOSIS_CACHE_MAX_ENTRIES", "256"))
+DIAGNOSIS_CACHE_TTL_SECONDS = float(os.environ.get("DIAGNOSIS_CACHE_TTL_SECONDS", str(24 * 3600)))
+DIAGNOSIS_CACHE_DIR = os.environ.get("DIAGNOSIS_CACHE_DIR", "")
+
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, "", ""))
+
+
+def diagnosis_cache_key(image_urls: list[str], crop: str | None, location: str | None, language: str) -> str:
+    images = sorted({_normalize_url(u) for u in image_urls if u})
+    payload = json.dumps(
+        {
+            "images": images,
+            "crop": (crop or "").strip().lower(),
+            "location": (location or "").strip().lower(),
+            "language": language.strip().lower(),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiagnosisCache:
+    def __init__(
+        self,
+        max_entries: int = DIAGNOSIS_CACHE_MAX_ENTRIES,
+        ttl: float = DIAGNOSIS_CACHE_TTL_SECONDS,
+        disk_dir: str = DIAGNOSIS_CACHE_DIR,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> tuple[float, dict] | None:
+        try:
+            with open(self._disk_path(key), encoding="utf-8") as f:
+                record = json.load(f)
+            return record["created"], record["entry"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Diagnosis cache read error: {e}")
+            return None
+
+    def _write_disk(self, key: str, created: float, entry: dict):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": created, "entry": entry}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Diagnosis cache write error: {e}")
+        self._prune_disk()
+
+    def _prune_disk(self):
+        # Same bounds as the memory tier: drop expired files, then the oldest
+        # beyond max_entries.
+        now = time.time()
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                mtime = os.path.getmtime(path)
+                if now - mtime > self.ttl:
+                    os.remove(path)
+                else:
+                    files.append((mtime, path))
+            except OSError:
+                continue
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remove_disk(self, key: str):
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _store_memory(self, key: str, created: float, entry: dict):
+        self._entries[key] = (created, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> dict | None:
+        now = time.time()
+        cached = self._entries.get(key)
+        if cached is not None:
+            created, entry = cached
+            if now - created <= self.ttl:
+                self._entries.move_to_end(key)
+                return entry
+            del self._entries[key]
+
+        if self.disk_dir:
+            record = await asyncio.to_thread(self._read_disk, key)
+            if record is not None:
+                created, entry = record
+                if now - created <= self.ttl:
+                    self.disk_hits += 1
+                    self._store_memory(key, created, entry)
+                    return entry
+                await asyncio.to_thread(self._remove_disk, key)
+        return None
+
+    async def put(self, key: str, entry: dict):
+        if "message" not in entry:
+            existing = await self.get(key)
+            if existing is not None and existing.get("message"):
+                return
+        created = time.time()
+        self._store_memory(key, created, entry)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, created, entry)
+
+    async def update(self, key: str, **fields):
+        cached = self._entries.get(key)
+        if cached is None:
+            return
+        created, entry = cached
+        entry = {**entry, **fields}
+        self._entries[key] = (created, entry)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, created, entry)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[dict | None]]) -> tuple[dict | None, bool]:
+        entry = await self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry, True
+
+        inflight = self._inflight.get(key)
+        while inflight is not None:
+            self.collapsed += 1
+            try:
+                return await asyncio.shield(inflight), True
+            except asyncio.CancelledError:
+                # The owner's session went away (e.g. the farmer reconnected);
+                # only give up if this caller was cancelled too.
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            inflight = self._inflight.get(key)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = await compute()
+            if entry is not None:
+                await self.put(key, entry)
+            future.set_result(entry)
+            return entry, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "collapsed": self.collapsed,
+        }
+
+
+_diagnosis_cache: DiagnosisCache | None = None
+
+
+def get_diagnosis_cache() -> DiagnosisCache:
+    global _diagnosis_cache
+    if _diagnosis_cache is None:
+        _diagnosis_cache = DiagnosisCache()
+    return _diagnosis_cache
@@ -0,0 +1,105 @@
+import os
+import uuid
+from collections import deque
+
+HISTORY_MAX_RECENT = int(os.environ.get("HISTORY_MAX_RECENT", "24"))
+HISTORY_SUMMARY_MAX_CHARS = int(os.environ.get("HISTORY_SUMMARY_MAX_CHARS", "2000"))
+SUMMARY_LINE_MAX_CHARS = 160
+
+
+class ConversationHistory:
+    def __init__(
+        self,
+        messages: list[dict] | None = None,
+        max_recent: int = HISTORY_MAX_RECENT,
+        summary_max_chars: int = HISTORY_SUMMARY_MAX_CHARS,
+        session_id: str | None = None,
+        summary: str = "",
+    ):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.max_recent = max_recent
+        self.summary_max_chars = summary_max_chars
+        self._recent: deque[dict] = deque()
+        self._summary_lines: deque[str] = deque()
+        self._summary_chars = 0
+        self._seq = 0
+        self._acked_seq: int | None = 0
+        for line in summary.splitlines():
+            if line.strip():
+                self._summary_lines.append(line)
+                self._summary_chars += len(line) + 1
+        for message in messages or []:
+            self.append(message)
+
+    def __len__(self) -> int:
+        return self._seq
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self._summary_lines)
+
+    def append(self, message: dict):
+        self._seq += 1
+        self._recent.append({"role": message["role"], "content": message["content"], "seq": self._seq})
+        while len(self._recent) > self.max_recent:
+            self._summarize(self._recent.popleft())
+
+    def _summarize(self, message: dict):
+        speaker = "Farmer" if message["role"] == "user" else "Assistant"
+        content = " ".join(message["content"].split())
+        if len(content) > SUMMARY_LINE_MAX_CHARS:
+            content = content[:SUMMARY_LINE_MAX_CHARS].rstrip() + "…"
+        line = f"{speaker}: {content}"
+        self._summary_lines.append(line)
+        self._summary_chars += len(line) + 1
+        while self._summary_chars > self.summary_max_chars and len(self._summary_lines) > 1:
+            self._summary_chars -= len(self._summary_lines.popleft()) + 1
+
+    def messages(self) -> list[dict]:
+        return [{"role": m["role"], "content": m["content"]} for m in self._recent]
+
+    def recent(self, count: int) -> list[dict]:
+        return self.messages()[-count:]
+
+    def sync_payload(self) -> dict:
+        oldest_seq = self._recent[0]["seq"] if self._recent else self._seq + 1
+        full = not self._acked_seq or self._acked_seq + 1 < oldest_seq
+        if full:
+            payload = {
+                "sessionId": self.session_id,
+                "baseSeq": 0,
+                "reset": True,
+                "messages": list(self._recent),
+            }
+            if self._summary_lines:
+                payload["summary"] = self.summary
+            return payload
+        return {
+            "sessionId": self.session_id,
+            "baseSeq": self._acked_seq,
+            "messages": [m for m in self._recent if m["seq"] > self._acked_seq],
+        }
+
+    def ack(self, seq: int | None):
+        if seq is not None and seq <= self._seq:
+            self._acked_seq = max(self._acked_seq or 0, seq)
+
+    def reset_sync(self):
+        self._acked_seq = None
+
+    def memory_bytes(self) -> int:
+        recent = sum(len(m["content"].encode("utf-8")) for m in self._recent)
+        return recent + len(self.summary.encode("utf-8"))
+
+    def stats(self) -> dict:
+        return {
+            "messages": self._seq,
+            "recent": len(self._recent),
+            "summary_lines": len(self._summary_lines),
+            "bytes": self.memory_bytes(),
+            "acked_seq": self._acked_seq,
+        }
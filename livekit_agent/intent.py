@@ -0,0 +1,111 @@
+import re
+from functools import lru_cache
+
+from lexicon import normalize
+
+PLAN_WORDS = ["plan", "योजना", "ప్రణాళిక", "ప్లాన్", "प्लान"]
+DAY_WORDS = ["day", "days", "दिन", "రోజుల", "రోజు", "రోజులు"]
+
+AFFIRMATIVES = [
+    "yes", "yeah", "yep", "yup", "sure", "ok", "okay", "please", "of course", "definitely",
+    "go ahead", "why not", "do it", "make it", "haan", "han", "haa", "theek hai", "thik hai",
+    "avunu", "sare", "ha", "kavali",
+    "हां", "हा", "जी हां", "हां जी", "ठीक है", "ठीक", "बिल्कुल", "जरूर", "बनाइए", "बनाइये",
+    "बना दीजिए", "बना दो", "बनाओ", "चाहिए", "ओके", "हां बनाइए",
+    "అవును", "సరే", "తప్పకుండా", "కావాలి", "చేయండి", "చెయ్యండి", "ఓకే", "అలాగే", "హా", "తయారు చేయండి",
+]
+
+NEGATIVES = [
+    "no", "nope", "not now", "later", "no need", "don't", "dont", "do not", "not needed",
+    "nahi", "nahin", "vaddu", "ledu",
+    "नहीं", "नही", "ना", "मत", "नो", "बाद में", "नहीं चाहिए", "नही चाहिए", "जरूरत नहीं",
+    "వద్దు", "లేదు", "అవసరం లేదు", "తర్వాత", "నో",
+]
+
+UNSURE = [
+    "not sure", "dont know", "don't know", "do not know", "maybe", "let me think", "pata nahi", "pata nahin",
+    "पता नहीं", "शायद", "सोचकर बताता", "सोच के बताता",
+    "తెలియదు", "ఏమో", "ఆలోచించి చెప్తా",
+]
+
+# "not" before an affirmative ("not sure", "not okay") undoes it.
+NEGATORS = ["not", "never"]
+
+QUESTION_WORDS = [
+    "what", "how", "why", "when", "which", "how much", "kya", "kaise", "kitna",
+    "क्या", "कैसे", "कितना", "कितने", "क्यों", "कब", "कौन",
+    "ఏమిటి", "ఎలా", "ఎంత", "ఎందుకు", "ఎప్పుడు", "ఏది",
+]
+
+MAX_PHRASE = 3
+SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+
+@lru_cache(maxsize=1)
+def _phrase_tables() -> tuple[set[str], set[str], set[str], set[str]]:
+    return (
+        {normalize(p) for p in AFFIRMATIVES},
+        {normalize(p) for p in NEGATIVES},
+        {normalize(p) for p in QUESTION_WORDS},
+        {normalize(p) for p in UNSURE},
+    )
+
+
+def _offers_plan(sentence: str) -> bool:
+    tokens = normalize(sentence).split()
+    has_plan = any(word in tokens for word in PLAN_WORDS)
+    has_days = "7" in tokens and any(word in tokens for word in DAY_WORDS)
+    return has_plan and (has_days or "?" in sentence)
+
+
+def is_plan_offer(text: str) -> bool:
+    # The farmer answers the last question asked, so when the message asks
+    # anything, that question itself must be the offer.
+    sentences = [s for s in SENTENCE_END.split(text.strip()) if s.strip()]
+    questions = [s for s in sentences if "?" in s]
+    if questions:
+        return _offers_plan(questions[-1])
+    return any(_offers_plan(s) for s in sentences)
+
+
+def mentions_plan(text: str) -> bool:
+    tokens = normalize(text).split()
+    return any(word in tokens for word in PLAN_WORDS)
+
+
+def classify_plan_reply(text: str) -> bool | None:
+    affirmatives, negatives, questions, unsure = _phrase_tables()
+    tokens = normalize(text).split()
+    if not tokens:
+        return None
+
+    consumed = [False] * len(tokens)
+    yes = no = asked = 0
+    for size in range(MAX_PHRASE, 0, -1):
+        for start in range(len(tokens) - size + 1):
+            if any(consumed[start:start + size]):
+                continue
+            phrase = " ".join(tokens[start:start + size])
+            if phrase in unsure:
+                asked += 1
+            elif phrase in negatives:
+                no += 1
+            elif phrase in affirmatives:
+                if start and tokens[start - 1] in NEGATORS:
+                    asked += 1
+                else:
+                    yes += 1
+            elif phrase in questions:
+                asked += 1
+            else:
+                continue
+            for i in range(start, start + size):
+                consumed[i] = True
+
+    if asked or "?" in text or (yes and no):
+        return None
+    if yes:
+        return True
+    if no:
+        return False
+    return None
@@ -0,0 +1,32 @@
+import argparse
+import json
+
+from tracing import LATENCY_TRACE_PATH, format_summary, summarize
+
+
+def load_records(path: str) -> list[dict]:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="p50/p95/p99 latency per voice-turn stage from a JSONL trace")
+    parser.add_argument("path", nargs="?", default=LATENCY_TRACE_PATH, help="JSONL file written via LATENCY_TRACE_PATH")
+    parser.add_argument("--by", default="", help="comma-separated tags to split by, e.g. language,phase")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("no trace file given and LATENCY_TRACE_PATH is not set")
+
+    by = tuple(tag for tag in args.by.split(",") if tag)
+    records = load_records(args.path)
+    print(f"{len(records)} samples from {args.path}\n")
+    print(format_summary(summarize(records, by=by)))
+
+
+if __name__ == "__main__":
+    main()
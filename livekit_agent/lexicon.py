@@ -0,0 +1,255 @@
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+
+CROPS = {
+    "Tomato": ["tomato", "tomatoes", "tamatar", "tamato", "टमाटर", "टमाटो", "టమాటో", "టమాటా", "టమాట"],
+    "Rice": ["rice", "paddy", "dhan", "dhaan", "chawal", "vari", "धान", "चावल", "వరి", "వడ్లు"],
+    "Wheat": ["wheat", "gehun", "gehu", "godhuma", "गेहूं", "गेहूँ", "गेंहू", "గోధుమ", "గోధుమలు"],
+    "Cotton": ["cotton", "kapas", "कपास", "పత్తి"],
+    "Chilli": ["chilli", "chillies", "chili", "mirchi", "mirapa", "मिर्च", "मिर्ची", "మిర్చి", "మిరప"],
+    "Brinjal": ["brinjal", "eggplant", "baingan", "vankaya", "बैंगन", "వంకాయ", "వంకాయలు"],
+    "Mango": ["mango", "mangoes", "mamidi", "మామిడి"],
+    "Banana": ["banana", "bananas", "kela", "arati", "केला", "केले", "అరటి"],
+    "Sugarcane": ["sugarcane", "sugar cane", "ganna", "cheraku", "गन्ना", "చెరకు"],
+    "Groundnut": ["groundnut", "peanut", "peanuts", "moongfali", "mungfali", "verusenaga", "palli", "मूंगफली", "వేరుశనగ", "పల్లీ"],
+    "Soybean": ["soybean", "soyabean", "soya", "सोयाबीन"],
+    "Onion": ["onion", "onions", "pyaz", "pyaaz", "ulli", "प्याज", "प्याज़", "ఉల్లి", "ఉల్లిపాయ", "ఉల్లిపాయలు"],
+    "Potato": ["potato", "potatoes", "aloo", "alu", "आलू", "బంగాళదుంప", "బంగాళాదుంప"],
+    "Mustard": ["mustard", "sarson", "सरसों"],
+    "Chickpea": ["chickpea", "chana", "चना"],
+    "Pigeon Pea": ["pigeon pea", "arhar", "toor", "tur dal", "kandi", "अरहर", "तुअर", "కంది"],
+    "Maize": ["maize", "corn", "makka", "makki", "मक्का", "మొక్కజొన్న"],
+    "Pearl Millet": ["pearl millet", "bajra", "बाजरा", "సజ్జ", "సజ్జలు"],
+    "Sorghum": ["sorghum", "jowar", "ज्वार", "జొన్న", "జొన్నలు"],
+}
+
+AMBIGUOUS_CROP_VARIANTS = {
+    "Mango": ["aam", "आम"],
+    "Chickpea": ["gram"],
+}
+
+STATES = {
+    "Andhra Pradesh": ["andhra pradesh", "andhra", "आंध्र प्रदेश", "आंध्र", "ఆంధ్రప్రదేశ్", "ఆంధ్ర ప్రదేశ్", "ఆంధ్ర"],
+    "Telangana": ["telangana", "तेलंगाना", "తెలంగాణ"],
+    "Maharashtra": ["maharashtra", "महाराष्ट्र", "మహారాష్ట్ర"],
+    "Karnataka": ["karnataka", "कर्नाटक", "కర్ణాటక"],
+    "Tamil Nadu": ["tamil nadu", "tamilnadu", "तमिलनाडु", "తమిళనాడు"],
+    "Uttar Pradesh": ["uttar pradesh", "यूपी", "उत्तर प्रदेश"],
+    "Madhya Pradesh": ["madhya pradesh", "एमपी", "मध्य प्रदेश"],
+    "Bihar": ["bihar", "बिहार"],
+    "Punjab": ["punjab", "पंजाब"],
+    "Haryana": ["haryana", "हरियाणा"],
+    "Rajasthan": ["rajasthan", "राजस्थान"],
+    "Gujarat": ["gujarat", "गुजरात"],
+    "Odisha": ["odisha", "orissa", "ओडिशा"],
+    "West Bengal": ["west bengal", "bengal", "पश्चिम बंगाल", "बंगाल"],
+    "Chhattisgarh": ["chhattisgarh", "छत्तीसगढ़"],
+}
+
+DISTRICTS = {
+    "Guntur": ("Andhra Pradesh", ["guntur", "गुंटूर", "గుంటూరు"]),
+    "Krishna": ("Andhra Pradesh", ["కృష్ణా"]),
+    "Kurnool": ("Andhra Pradesh", ["kurnool", "कुरनूल", "కర్నూలు"]),
+    "Anantapur": ("Andhra Pradesh", ["anantapur", "anantapuram", "अनंतपुर", "అనంతపురం", "అనంతపూర్"]),
+    "Nellore": ("Andhra Pradesh", ["nellore", "नेल्लोर", "నెల్లూరు"]),
+    "Prakasam": ("Andhra Pradesh", ["prakasam", "ప్రకాశం"]),
+    "Chittoor": ("Andhra Pradesh", ["chittoor", "चित्तूर", "చిత్తూరు"]),
+    "Kadapa": ("Andhra Pradesh", ["kadapa", "cuddapah", "कडपा", "కడప"]),
+    "East Godavari": ("Andhra Pradesh", ["east godavari", "తూర్పు గోదావరి"]),
+    "West Godavari": ("Andhra Pradesh", ["west godavari", "పశ్చిమ గోదావరి"]),
+    "Visakhapatnam": ("Andhra Pradesh", ["visakhapatnam", "vizag", "विशाखापत्तनम", "విశాఖపట్నం", "విశాఖ"]),
+    "Srikakulam": ("Andhra Pradesh", ["srikakulam", "శ్రీకాకుళం"]),
+    "Vizianagaram": ("Andhra Pradesh", ["vizianagaram", "విజయనగరం"]),
+    "Warangal": ("Telangana", ["warangal", "वारंगल", "వరంగల్"]),
+    "Karimnagar": ("Telangana", ["karimnagar", "करीमनगर", "కరీంనగర్"]),
+    "Nizamabad": ("Telangana", ["nizamabad", "निज़ामाबाद", "निजामाबाद", "నిజామాబాద్"]),
+    "Khammam": ("Telangana", ["khammam", "खम्मम", "ఖమ్మం"]),
+    "Nalgonda": ("Telangana", ["nalgonda", "नलगोंडा", "నల్గొండ", "నల్లగొండ"]),
+    "Adilabad": ("Telangana", ["adilabad", "आदिलाबाद", "ఆదిలాబాద్"]),
+    "Mahabubnagar": ("Telangana", ["mahabubnagar", "महबूबनगर", "మహబూబ్నగర్"]),
+    "Medak": ("Telangana", ["medak", "मेडक", "మెదక్"]),
+    "Rangareddy": ("Telangana", ["rangareddy", "ranga reddy", "రంగారెడ్డి"]),
+    "Hyderabad": ("Telangana", ["hyderabad", "हैदराबाद", "హైదరాబాద్"]),
+    "Siddipet": ("Telangana", ["siddipet", "సిద్దిపేట"]),
+    "Nashik": ("Maharashtra", ["nashik", "nasik", "नासिक", "नाशिक"]),
+    "Nagpur": ("Maharashtra", ["nagpur", "नागपुर"]),
+    "Pune": ("Maharashtra", ["pune", "पुणे"]),
+    "Indore": ("Madhya Pradesh", ["indore", "इंदौर"]),
+    "Bhopal": ("Madhya Pradesh", ["bhopal", "भोपाल"]),
+    "Jabalpur": ("Madhya Pradesh", ["jabalpur", "जबलपुर"]),
+    "Lucknow": ("Uttar Pradesh", ["lucknow", "लखनऊ"]),
+    "Varanasi": ("Uttar Pradesh", ["varanasi", "banaras", "वाराणसी", "बनारस"]),
+    "Kanpur": ("Uttar Pradesh", ["kanpur", "कानपुर"]),
+    "Agra": ("Uttar Pradesh", ["agra", "आगरा"]),
+    "Meerut": ("Uttar Pradesh", ["meerut", "मेरठ"]),
+    "Gorakhpur": ("Uttar Pradesh", ["gorakhpur", "गोरखपुर"]),
+    "Patna": ("Bihar", ["patna", "पटना"]),
+    "Jaipur": ("Rajasthan", ["jaipur", "जयपुर"]),
+    "Ludhiana": ("Punjab", ["ludhiana", "लुधियाना"]),
+    "Amritsar": ("Punjab", ["amritsar", "अमृतसर"]),
+    "Karnal": ("Haryana", ["karnal", "करनाल"]),
+    "Raipur": ("Chhattisgarh", ["raipur", "रायपुर"]),
+}
+
+LOCATION_CUES = {
+    "district", "village", "mandal", "taluk", "taluka", "tehsil", "block", "gaon", "jila", "zila", "jilla",
+    "जिला", "जिले", "गांव", "गाव", "तहसील", "ब्लॉक",
+    "జిల్లా", "గ్రామం", "మండలం", "ఊరు",
+}
+
+SUFFIXES = ("లోని", "లో", "లు", "ను", "ని", "కి", "కు", "తో", "ది", "ों", "ें", "es", "s")
+
+MAX_NGRAM = 3
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFC", text)
+    text = text.replace("\u200c", "").replace("\u200d", "")
+    text = text.replace("\u093c", "").replace("\u0901", "\u0902")
+    text = "".join(" " if unicodedata.category(ch)[0] in "PS" else ch for ch in text.lower())
+    return " ".join(text.split())
+
+
+@dataclass
+class Lexicon:
+    crops: dict[str, str]
+    ambiguous_crops: dict[str, str]
+    states: dict[str, str]
+    districts: dict[str, str]
+    district_states: dict[str, str]
+    cues: set[str]
+
+
+@lru_cache(maxsize=1)
+def get_lexicon() -> Lexicon:
+    crops = {normalize(v): name for name, variants in CROPS.items() for v in variants}
+    ambiguous = {normalize(v): name for name, variants in AMBIGUOUS_CROP_VARIANTS.items() for v in variants}
+    states = {normalize(v): name for name, variants in STATES.items() for v in variants}
+    districts = {}
+    district_states = {}
+    for name, (state, variants) in DISTRICTS.items():
+        district_states[name] = state
+        for v in variants:
+            districts[normalize(v)] = name
+    return Lexicon(
+        crops=crops,
+        ambiguous_crops=ambiguous,
+        states=states,
+        districts=districts,
+        district_states=district_states,
+        cues={normalize(c) for c in LOCATION_CUES},
+    )
+
+
+def _lookup(table: dict[str, str], phrase: str) -> str | None:
+    hit = table.get(phrase)
+    if hit:
+        return hit
+    for suffix in SUFFIXES:
+        if phrase.endswith(suffix) and len(phrase) - len(suffix) >= 2:
+            hit = table.get(phrase[: -len(suffix)])
+            if hit:
+                return hit
+    return None
+
+
+@dataclass
+class TurnMatches:
+    crops: list[str]
+    ambiguous_crops: list[str]
+    states: list[str]
+    districts: list[str]
+    unresolved_cue: bool
+
+    @property
+    def recognized(self) -> bool:
+        return bool(self.crops or self.ambiguous_crops or self.states or self.districts)
+
+
+def match_turn(text: str, lexicon: Lexicon | None = None) -> TurnMatches:
+    lexicon = lexicon or get_lexicon()
+    tokens = normalize(text).split()
+    matches = TurnMatches([], [], [], [], False)
+    consumed = [False] * len(tokens)
+
+    for size in range(MAX_NGRAM, 0, -1):
+        for start in range(len(tokens) - size + 1):
+            if any(consumed[start:start + size]):
+                continue
+            phrase = " ".join(tokens[start:start + size])
+            for table, bucket in (
+                (lexicon.districts, matches.districts),
+                (lexicon.states, matches.states),
+                (lexicon.crops, matches.crops),
+                (lexicon.ambiguous_crops, matches.ambiguous_crops),
+            ):
+                hit = _lookup(table, phrase)
+                if hit:
+                    bucket.append(hit)
+                    for i in range(start, start + size):
+                        consumed[i] = True
+                    break
+
+    for i, token in enumerate(tokens):
+        if token in lexicon.cues:
+            neighbours = [j for j in (i - 1, i + 1) if 0 <= j < len(tokens)]
+            if not any(consumed[j] for j in neighbours):
+                matches.unresolved_cue = True
+    return matches
+
+
+@lru_cache(maxsize=2048)
+def _match_turn_cached(text: str) -> TurnMatches:
+    return match_turn(text)
+
+
+@dataclass
+class LocalExtraction:
+    crop: str | None
+    location: str | None
+    unsure: bool
+
+
+def extract_crop_location(messages: list[dict]) -> LocalExtraction:
+    lexicon = get_lexicon()
+    crops: list[str] = []
+    ambiguous_crops: list[str] = []
+    states: list[str] = []
+    districts: list[str] = []
+    unresolved_cue = False
+    last_recognized = True
+
+    for message in messages:
+        if message.get("role") != "user":
+            continue
+        turn = _match_turn_cached(message.get("content", ""))
+        crops.extend(c for c in turn.crops if c not in crops)
+        ambiguous_crops.extend(c for c in turn.ambiguous_crops if c not in ambiguous_crops)
+        states.extend(s for s in turn.states if s not in states)
+        districts.extend(d for d in turn.districts if d not in districts)
+        unresolved_cue = unresolved_cue or turn.unresolved_cue
+        last_recognized = turn.recognized
+
+    unsure = unresolved_cue
+    crop = None
+    if len(crops) == 1:
+        crop = crops[0]
+    elif crops or ambiguous_crops:
+        unsure = True
+
+    location = None
+    if len(districts) == 1:
+        state = lexicon.district_states.get(districts[0])
+        location = f"{districts[0]}, {state}" if state else districts[0]
+    elif len(districts) > 1:
+        unsure = True
+    elif len(states) == 1:
+        location = states[0]
+    elif len(states) > 1:
+        unsure = True
+
+    if (crop is None or location is None) and not last_recognized:
+        unsure = True
+
+    return LocalExtraction(crop=crop, location=location, unsure=unsure)
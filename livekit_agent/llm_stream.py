@@ -0,0 +1,55 @@
+import asyncio
+import os
+import re
+from typing import AsyncIterator
+
+SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+|\n+")
+MAX_BUFFERED_CHARS = 240
+
+_genai_client = None
+
+
+def get_genai_client():
+    global _genai_client
+    if _genai_client is None:
+        from google import genai
+        api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY", "")
+        _genai_client = genai.Client(api_key=api_key)
+    return _genai_client
+
+
+async def _text_chunks(prompt: str, model: str) -> AsyncIterator[str]:
+    client = get_genai_client()
+    stream = await client.aio.models.generate_content_stream(model=model, contents=prompt)
+    async for chunk in stream:
+        if chunk.text:
+            yield chunk.text
+
+
+async def stream_sentences(prompt: str, model: str = "gemini-2.0-flash", deadline: float = 8.0) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    expires_at = loop.time() + deadline
+    chunks = _text_chunks(prompt, model)
+    buffer = ""
+    try:
+        while True:
+            remaining = expires_at - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            try:
+                buffer += await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+            except StopAsyncIteration:
+                break
+
+            parts = SENTENCE_END.split(buffer)
+            buffer = parts.pop()
+            for sentence in parts:
+                if sentence.strip():
+                    yield sentence.strip() + " "
+            if len(buffer) > MAX_BUFFERED_CHARS:
+                yield buffer.strip() + " "
+                buffer = ""
+        if buffer.strip():
+            yield buffer.strip()
+    finally:
+        await chunks.aclose()
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+logger = logging.getLogger("khetsaathi-agent")
+
+SESSION_STATE_STORE = os.environ.get("SESSION_STATE_STORE", "")
+SESSION_STATE_TTL_SECONDS = int(os.environ.get("SESSION_STATE_TTL_SECONDS", str(6 * 3600)))
+
+# Snapshot layout, shared with server/services/sessionStateService.ts:
+#   b"KS" | version (u8) | zlib-compressed UTF-8 JSON with one-letter keys.
+SNAPSHOT_MAGIC = b"KS"
+SNAPSHOT_VERSION = 1
+PLAN_STATUSES = ("none", "partial", "done")
+ROLES = ("user", "assistant")
+
+# File store entries start with their expiry as unix seconds (u64, big-endian).
+EXPIRY_HEADER = struct.Struct(">Q")
+SWEEP_INTERVAL_SECONDS = 60.0
+
+
+@dataclass
+class SessionState:
+    language: str = "English"
+    phone: str = ""
+    image_urls: list[str] = field(default_factory=list)
+    messages: list[dict] = field(default_factory=list)
+    summary: str = ""
+    crop: str | None = None
+    location: str | None = None
+    diagnosis: dict | None = None
+    plan_status: str = "none"
+
+
+def encode_session_state(state: SessionState) -> bytes:
+    payload = {
+        "l": state.language,
+        "p": state.phone,
+        "i": state.image_urls,
+        "h": [[ROLES.index(m["role"]), m["content"]] for m in state.messages if m.get("role") in ROLES],
+        "s": state.summary,
+        "c": state.crop,
+        "o": state.location,
+        "d": state.diagnosis,
+        "g": PLAN_STATUSES.index(state.plan_status),
+    }
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return SNAPSHOT_MAGIC + bytes([SNAPSHOT_VERSION]) + zlib.compress(body, 9)
+
+
+def decode_session_state(data: bytes) -> SessionState:
+    if data[:2] != SNAPSHOT_MAGIC:
+        raise ValueError("not a session state snapshot")
+    version = data[2]
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported session state version {version}")
+    payload = json.loads(zlib.decompress(data[3:]).decode("utf-8"))
+    status = payload.get("g", 0)
+    return SessionState(
+        language=payload.get("l") or "English",
+        phone=payload.get("p") or "",
+        image_urls=payload.get("i") or [],
+        messages=[{"role": ROLES[role], "content": content} for role, content in payload.get("h") or []],
+        summary=payload.get("s") or "",
+        crop=payload.get("c") or None,
+        location=payload.get("o") or None,
+        diagnosis=payload.get("d") or None,
+        plan_status=PLAN_STATUSES[status] if 0 <= status < len(PLAN_STATUSES) else "none",
+    )
+
+
+class FileStateStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._last_sweep = 0.0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.kss")
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        (expires_at,) = EXPIRY_HEADER.unpack_from(data)
+        if expires_at and expires_at < time.time():
+            self.delete(key)
+            return None
+        return data[EXPIRY_HEADER.size:]
+
+    def set(self, key: str, value: bytes, ex: int | None = None):
+        expires_at = int(time.time()) + ex if ex else 0
+        path = self._path(key)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(EXPIRY_HEADER.pack(expires_at) + value)
+        os.replace(f"{path}.tmp", path)
+        self._sweep()
+
+    def _sweep(self):
+        # Keys are single-use, so most are never read again once they expire.
+        now = time.time()
+        if now - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+        for name in os.listdir(self.directory):
+            if not name.endswith(".kss"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "rb") as f:
+                    (expires_at,) = EXPIRY_HEADER.unpack(f.read(EXPIRY_HEADER.size))
+                if expires_at and expires_at < now:
+                    os.remove(path)
+            except (OSError, struct.error):
+                continue
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class SQLiteStateStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_state (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM session_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ex: int | None = None):
+        expires_at = time.time() + ex if ex else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO session_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._conn.execute("DELETE FROM session_state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM session_state WHERE key = ?", (key,))
+            self._conn.commit()
+
+
+def open_state_store(url: str = SESSION_STATE_STORE):
+    # Every store speaks the Redis subset get / set(ex=) / delete, so a
+    # redis.Redis client can be dropped in unchanged.
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return FileStateStore(parsed.path)
+    if parsed.scheme == "sqlite":
+        return SQLiteStateStore(parsed.path)
+    if parsed.scheme in ("redis", "rediss"):
+        import redis
+        return redis.Redis.from_url(url)
+    raise ValueError(f"unsupported SESSION_STATE_STORE {url!r}")
+
+
+_state_store = None
+
+
+def get_state_store():
+    global _state_store
+    if _state_store is None:
+        _state_store = open_state_store()
+    return _state_store
+
+
+async def load_session_state(key: str) -> SessionState | None:
+    if not SESSION_STATE_STORE:
+        logger.error(f"Room has session state {key} but SESSION_STATE_STORE is not set")
+        return None
+    try:
+        data = await asyncio.to_thread(get_state_store().get, key)
+        if data is None:
+            logger.warning(f"Session state {key} not found or expired")
+            return None
+        state = decode_session_state(bytes(data))
+        # Every token request issues a fresh key, so the snapshot is done with.
+        await asyncio.to_thread(get_state_store().delete, key)
+        return state
+    except Exception as e:
+        logger.error(f"Session state load error for {key}: {e}")
+        return None
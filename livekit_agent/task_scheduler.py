@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("khetsaathi-agent")
+
+JobFn = Callable[[], Awaitable[None]]
+
+
+class TurnTaskScheduler:
+    def __init__(self, debounce: float = 0.3):
+        self.debounce = debounce
+        self._pending: dict[str, JobFn] = {}
+        self._drivers: dict[str, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+        self.scheduled = 0
+        self.runs = 0
+        self.coalesced = 0
+
+    def schedule(self, kind: str, fn: JobFn, debounce: float | None = None):
+        if self._closed:
+            return
+        self.scheduled += 1
+        if kind in self._pending:
+            self.coalesced += 1
+        self._pending[kind] = fn
+        if kind not in self._drivers:
+            delay = self.debounce if debounce is None else debounce
+            task = asyncio.create_task(self._drive(kind, delay), name=f"khetsaathi-{kind}")
+            self._drivers[kind] = task
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def is_busy(self, kind: str) -> bool:
+        return kind in self._drivers
+
+    async def _drive(self, kind: str, delay: float):
+        try:
+            while kind in self._pending:
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                fn = self._pending.pop(kind, None)
+                if fn is None:
+                    break
+                self.runs += 1
+                try:
+                    await fn()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Background {kind} job error: {e}")
+        finally:
+            if self._drivers.get(kind) is asyncio.current_task():
+                del self._drivers[kind]
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": self.scheduled,
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._drivers),
+        }
+
+    async def close(self):
+        self._closed = True
+        self._pending.clear()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,127 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Iterable
+
+logger = logging.getLogger("khetsaathi-agent")
+
+LATENCY_TRACE_PATH = os.environ.get("LATENCY_TRACE_PATH", "")
+LATENCY_SAMPLES_PER_STAGE = int(os.environ.get("LATENCY_SAMPLES_PER_STAGE", "5000"))
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(records: Iterable[dict], by: tuple[str, ...] = ()) -> dict[str, dict]:
+    groups: dict[str, list[float]] = defaultdict(list)
+    for record in records:
+        label = " ".join([record["stage"], *(f"{k}={record.get(k)}" for k in by)])
+        groups[label].append(record["ms"])
+    summary = {}
+    for label, values in sorted(groups.items()):
+        values.sort()
+        summary[label] = {"count": len(values), **{f"p{p}": round(percentile(values, p), 1) for p in PERCENTILES}}
+    return summary
+
+
+def format_summary(summary: dict[str, dict]) -> str:
+    width = max([len(label) for label in summary] + [5])
+    lines = [f"{'stage'.ljust(width)}  {'count':>6}  {'p50':>9}  {'p95':>9}  {'p99':>9}"]
+    for label, row in summary.items():
+        lines.append(f"{label.ljust(width)}  {row['count']:>6}  {row['p50']:>7.1f}ms  {row['p95']:>7.1f}ms  {row['p99']:>7.1f}ms")
+    return "\n".join(lines)
+
+
+class LatencyRecorder:
+    def __init__(self, path: str = LATENCY_TRACE_PATH, max_samples: int = LATENCY_SAMPLES_PER_STAGE):
+        self.path = path
+        self._samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=max_samples))
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+    def record(self, record: dict):
+        self._samples[record["stage"]].append(record)
+        if self._file is not None:
+            line = json.dumps(record, ensure_ascii=False)
+            with self._lock:
+                self._file.write(line + "\n")
+
+    def summary(self) -> dict[str, dict]:
+        return summarize(r for samples in list(self._samples.values()) for r in samples)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_recorder: LatencyRecorder | None = None
+
+
+def get_latency_recorder() -> LatencyRecorder:
+    global _recorder
+    if _recorder is None:
+        _recorder = LatencyRecorder()
+    return _recorder
+
+
+class TurnTracer:
+    def __init__(self, session_id: str, language: str, recorder: LatencyRecorder | None = None):
+        self.session_id = session_id
+        self.language = language
+        self.phase = "gathering"
+        self.turn = 0
+        self._recorder = recorder or get_latency_recorder()
+
+    def record(self, stage: str, ms: float, **tags):
+        self._recorder.record({
+            "ts": round(time.time(), 3),
+            "session": self.session_id,
+            "stage": stage,
+            "ms": round(ms, 2),
+            "language": self.language,
+            "phase": self.phase,
+            "turn": self.turn,
+            **tags,
+        })
+
+    def on_metrics(self, metrics):
+        speech_id = getattr(metrics, "speech_id", None)
+        kind = type(metrics).__name__
+        if kind == "EOUMetrics":
+            self.record("end_of_utterance", metrics.end_of_utterance_delay * 1000, speech_id=speech_id)
+            self.record("transcript_final", metrics.transcription_delay * 1000, speech_id=speech_id)
+        elif kind == "LLMMetrics" and getattr(metrics, "ttft", -1) >= 0:
+            self.record("llm_first_token", metrics.ttft * 1000, speech_id=speech_id)
+        elif kind == "TTSMetrics" and getattr(metrics, "ttfb", -1) >= 0:
+            self.record("tts_first_frame", metrics.ttfb * 1000, speech_id=speech_id)
+
+    @contextmanager
+    def backend_span(self, path: str):
+        started_at = time.time()
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.record(
+                f"backend:{path}",
+                (time.perf_counter() - start) * 1000,
+                start=round(started_at, 3),
+                end=round(time.time(), 3),
+                status=status,
+            )
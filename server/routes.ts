@@ -4,9 +4,11 @@ import multer from "multer";
 import sharp from "sharp";
 import { uploadToS3 } from "./services/s3Service";
 import { detectDisease } from "./services/diseaseService";
-import { generateChatReply, extractCropAndLocation, detectPlanIntent, generateConversationalPlan, generateConversationSummary, generatePlanSummaryMessage, getGreeting, type ChatMessage } from "./services/chatService";
+import { generateChatReply, extractCropAndLocation, detectPlanIntent, generateConversationalPlan, streamConversationalPlan, PlanSectionSplitter, generateConversationSummary, generatePlanSummaryMessage, getGreeting, type ChatMessage } from "./services/chatService";
 import { saveUserToDynamo, saveUserCase, saveChatSummary, getChatSummaries, getUserCases, updateUserProfileImage, getUserFromDynamo } from "./services/dynamoService";
 import { generatePdf } from "./services/pdfService";
+import { resolveConversation, ConversationOutOfSyncError } from "./services/conversationSyncService";
+import { saveSessionState } from "./services/sessionStateService";
 import { uploadPdfToS3 } from "./services/s3Service";
 import { phoneSchema, languageSchema } from "@shared/schema";
 import { z } from "zod";
@@ -36,36 +38,40 @@ const chatMessageSchema = z.object({
   diagnosisAvailable: z.boolean().optional(),
 });
 
-const extractSchema = z.object({
+const conversationSyncFields = {
   messages: z.array(z.object({
     role: z.enum(["user", "assistant"]),
     content: z.string(),
+    seq: z.number().int().optional(),
   })),
+  sessionId: z.string().optional(),
+  baseSeq: z.number().int().optional(),
+  reset: z.boolean().optional(),
+  summary: z.string().optional(),
+};
+
+const extractSchema = z.object({
+  ...conversationSyncFields,
 });
 
 const diagnoseFromChatSchema = z.object({
   imageUrls: z.array(z.string()).min(1),
-  crop: z.string().min(1),
-  location: z.string().min(1),
+  crop: z.string().optional().default(""),
+  location: z.string().optional().default(""),
   language: z.string(),
 });
 
 const planIntentSchema = z.object({
-  messages: z.array(z.object({
-    role: z.enum(["user", "assistant"]),
-    content: z.string(),
-  })),
+  ...conversationSyncFields,
 });
 
 const generatePlanSchema = z.object({
-  messages: z.array(z.object({
-    role: z.enum(["user", "assistant"]),
-    content: z.string(),
-  })),
+  ...conversationSyncFields,
   diagnosis: z.record(z.any()),
   language: z.string(),
   imageUrls: z.array(z.string()),
   phone: z.string().min(10),
+  stream: z.boolean().optional(),
 });
 
 const saveUsercaseSchema = z.object({
@@ -218,10 +224,13 @@ export async function registerRoutes(
       if (!validation.success) {
         return res.status(400).json({ message: validation.error.errors.map(e => e.message).join(", ") });
       }
-      const { messages } = validation.data;
+      const { messages, seq } = resolveConversation(validation.data);
       const extracted = await extractCropAndLocation(messages);
-      return res.json(extracted);
+      return res.json({ ...extracted, seq });
     } catch (error: any) {
+      if (error instanceof ConversationOutOfSyncError) {
+        return res.status(409).json({ message: error.message, seq: error.seq });
+      }
       log(`Extract info error: ${error.message}`);
       return res.status(500).json({ message: "Failed to extract info" });
     }
@@ -234,7 +243,7 @@ export async function registerRoutes(
         return res.status(400).json({ message: validation.error.errors.map(e => e.message).join(", ") });
       }
       const { imageUrls, crop, location, language } = validation.data;
-      log(`Diagnosing from chat: crop=${crop}, location=${location}`);
+      log(`Diagnosing from chat: crop=${crop || "unknown"}, location=${location || "unknown"}`);
       const result = await detectDisease({ images: imageUrls, crop, location, language });
 
       let diagnosis = result;
@@ -258,10 +267,13 @@ export async function registerRoutes(
       if (!validation.success) {
         return res.status(400).json({ message: validation.error.errors.map(e => e.message).join(", ") });
       }
-      const { messages } = validation.data;
+      const { messages, seq } = resolveConversation(validation.data);
       const wantsPlan = await detectPlanIntent(messages);
-      return res.json({ wantsPlan });
+      return res.json({ wantsPlan, seq });
     } catch (error: any) {
+      if (error instanceof ConversationOutOfSyncError) {
+        return res.status(409).json({ message: error.message, seq: error.seq });
+      }
       log(`Plan intent error: ${error.message}`);
       return res.status(500).json({ message: "Failed to detect intent" });
     }
@@ -273,46 +285,86 @@ export async function registerRoutes(
       if (!validation.success) {
         return res.status(400).json({ message: validation.error.errors.map(e => e.message).join(", ") });
       }
-      const { messages, diagnosis, language, imageUrls, phone } = validation.data;
+      const { diagnosis, language, imageUrls, phone, stream } = validation.data;
+      const { messages, seq } = resolveConversation(validation.data);
+
+      const finalizePlan = async (plan: string) => {
+        let pdfUrl = "";
+        try {
+          const pdfBuffer = await generatePdf(plan, language);
+          pdfUrl = await uploadPdfToS3(pdfBuffer, phone);
+          log(`PDF uploaded to S3: ${pdfUrl}`);
+        } catch (pdfErr: any) {
+          log(`PDF generation/upload error: ${pdfErr.message}`);
+        }
+
+        let planSummaryMsg = "";
+        try {
+          planSummaryMsg = await generatePlanSummaryMessage(plan, diagnosis, language);
+          log("Plan summary message generated");
+        } catch (summaryMsgErr: any) {
+          log(`Plan summary message error: ${summaryMsgErr.message}`);
+        }
+
+        try {
+          const conversationSummary = await generateConversationSummary(messages, diagnosis);
+          await saveChatSummary({
+            phone,
+            timestamp: new Date().toISOString(),
+            conversationSummary,
+            pdfUrl: pdfUrl || "pdf_generation_failed",
+            language,
+            diagnosis,
+            imageUrls,
+          });
+          log(`Chat summary saved for ${phone}`);
+        } catch (summaryErr: any) {
+          log(`Chat summary save error: ${summaryErr.message}`);
+        }
+
+        return { pdfUrl, planSummaryMsg };
+      };
+
+      if (stream) {
+        // NDJSON: one "section" event per "## " block as the model writes it,
+        // then "done" with the PDF and summary, or "error" if the stream breaks.
+        res.status(200);
+        res.setHeader("Content-Type", "application/x-ndjson");
+        res.setHeader("Cache-Control", "no-cache");
+        res.flushHeaders();
+        const sendEvent = (event: Record<string, any>) => res.write(JSON.stringify(event) + "\n");
+        const splitter = new PlanSectionSplitter();
+        let sections = 0;
+        try {
+          log("Streaming treatment plan from conversation...");
+          for await (const chunk of streamConversationalPlan(messages, diagnosis, language, imageUrls)) {
+            for (const section of splitter.push(chunk)) {
+              sendEvent({ type: "section", index: sections++, ...section });
+            }
+          }
+          for (const section of splitter.end()) {
+            sendEvent({ type: "section", index: sections++, ...section });
+          }
+          log("Treatment plan streamed, generating PDF...");
+          const { pdfUrl, planSummaryMsg } = await finalizePlan(splitter.text);
+          sendEvent({ type: "done", sections, pdfUrl, planSummaryMessage: planSummaryMsg, seq });
+        } catch (streamErr: any) {
+          log(`Generate plan stream error after ${sections} sections: ${streamErr.message}`);
+          sendEvent({ type: "error", sections, message: "Plan generation failed", seq });
+        }
+        return res.end();
+      }
+
       log("Generating treatment plan from conversation...");
       const plan = await generateConversationalPlan(messages, diagnosis, language, imageUrls);
       log("Treatment plan generated, generating PDF...");
+      const { pdfUrl, planSummaryMsg } = await finalizePlan(plan);
 
-      let pdfUrl = "";
-      try {
-        const pdfBuffer = await generatePdf(plan, language);
-        pdfUrl = await uploadPdfToS3(pdfBuffer, phone);
-        log(`PDF uploaded to S3: ${pdfUrl}`);
-      } catch (pdfErr: any) {
-        log(`PDF generation/upload error: ${pdfErr.message}`);
-      }
-
-      let planSummaryMsg = "";
-      try {
-        planSummaryMsg = await generatePlanSummaryMessage(plan, diagnosis, language);
-        log("Plan summary message generated");
-      } catch (summaryMsgErr: any) {
-        log(`Plan summary message error: ${summaryMsgErr.message}`);
-      }
-
-      try {
-        const conversationSummary = await generateConversationSummary(messages, diagnosis);
-        await saveChatSummary({
-          phone,
-          timestamp: new Date().toISOString(),
-          conversationSummary,
-          pdfUrl: pdfUrl || "pdf_generation_failed",
-          language,
-          diagnosis,
-          imageUrls,
-        });
-        log(`Chat summary saved for ${phone}`);
-      } catch (summaryErr: any) {
-        log(`Chat summary save error: ${summaryErr.message}`);
-      }
-
-      return res.json({ plan, pdfUrl, planSummaryMessage: planSummaryMsg });
+      return res.json({ plan, pdfUrl, planSummaryMessage: planSummaryMsg, seq });
     } catch (error: any) {
+      if (error instanceof ConversationOutOfSyncError) {
+        return res.status(409).json({ message: error.message, seq: error.seq });
+      }
       log(`Generate plan error: ${error.message}`);
       return res.status(500).json({ message: "Plan generation failed" });
     }
@@ -381,14 +433,20 @@ export async function registerRoutes(
         phone: z.string().min(10),
         language: z.string(),
         imageUrls: z.array(z.string()),
-        chatHistory: z.array(z.object({ role: z.string(), content: z.string() })).optional().default([]),
+        chatHistory: z.array(z.object({ role: z.enum(["user", "assistant"]), content: z.string() })).optional().default([]),
+        sessionState: z.object({
+          crop: z.string().nullable().optional(),
+          location: z.string().nullable().optional(),
+          diagnosis: z.record(z.any()).nullable().optional(),
+          planStatus: z.enum(["none", "partial", "done"]).optional(),
+        }).optional(),
       });
       const validation = schema.safeParse(req.body);
       if (!validation.success) {
         return res.status(400).json({ message: validation.error.errors.map(e => e.message).join(", ") });
       }
 
-      const { phone, language, imageUrls, chatHistory } = validation.data;
+      const { phone, language, imageUrls, chatHistory, sessionState } = validation.data;
 
       const apiKey = process.env.LIVEKIT_API_KEY;
       const apiSecret = process.env.LIVEKIT_API_SECRET;
@@ -398,10 +456,21 @@ export async function registerRoutes(
         return res.status(500).json({ message: "LiveKit not configured" });
       }
 
-      const recentHistory = chatHistory.slice(-20);
       const roomName = `khetsaathi-${phone}-${Date.now()}`;
       const participantIdentity = `farmer-${phone}`;
-      const roomMetadata = JSON.stringify({ phone, language, imageUrls, chatHistory: recentHistory });
+
+      // With a shared SESSION_STATE_STORE, room metadata carries a short key to
+      // the session snapshot instead of the history; otherwise, or if the save
+      // fails, the recent history goes inline as before.
+      let stateKey: string | null = null;
+      try {
+        stateKey = await saveSessionState({ phone, language, imageUrls, messages: chatHistory, ...sessionState });
+      } catch (error: any) {
+        log(`Session state save error, using inline metadata: ${error.message}`);
+      }
+      const roomMetadata = stateKey
+        ? JSON.stringify({ phone, language, imageUrls, stateKey })
+        : JSON.stringify({ phone, language, imageUrls, chatHistory: chatHistory.slice(-20) });
 
       const roomService = new RoomServiceClient(livekitUrl, apiKey, apiSecret);
       await roomService.createRoom({
@@ -429,6 +498,7 @@ export async function registerRoutes(
         token: jwt,
         url: livekitUrl,
         roomName,
+        stateKey,
       });
     } catch (error: any) {
       log(`LiveKit token error: ${error.message}`);
@@ -202,19 +202,16 @@ Respond with ONLY "yes" or "no". The farmer might say yes in any language (Hindi
   return text.includes("yes");
 }
 
-export async function generateConversationalPlan(
+function buildPlanPrompt(
   messages: ChatMessage[],
   diagnosis: Record<string, any>,
   language: string,
-  imageUrls: string[],
-): Promise<string> {
-  const model = genAI.getGenerativeModel({ model: "gemini-2.0-flash" });
-
+): string {
   const conversation = messages
     .map((m) => `${m.role === "user" ? "Farmer" : "Assistant"}: ${m.content}`)
     .join("\n");
 
-  const prompt = `You are an experienced agricultural crop doctor creating a 7-Day Treatment Plan for a farmer.
+  return `You are an experienced agricultural crop doctor creating a 7-Day Treatment Plan for a farmer.
 Respond ENTIRELY in ${language} language. Use simple farmer-friendly language.
 
 **Full Conversation with Farmer:**
@@ -268,11 +265,76 @@ Generate the plan in this EXACT structure using markdown:
 - Seed selection tips
 
 Use bullet points throughout. Keep each point short and actionable. The farmer should be able to read one bullet and know exactly what to do.`;
+}
 
-  const result = await model.generateContent(prompt);
+export async function generateConversationalPlan(
+  messages: ChatMessage[],
+  diagnosis: Record<string, any>,
+  language: string,
+  imageUrls: string[],
+): Promise<string> {
+  const model = genAI.getGenerativeModel({ model: "gemini-2.0-flash" });
+  const result = await model.generateContent(buildPlanPrompt(messages, diagnosis, language));
   return result.response.text();
 }
 
+export async function* streamConversationalPlan(
+  messages: ChatMessage[],
+  diagnosis: Record<string, any>,
+  language: string,
+  imageUrls: string[],
+): AsyncGenerator<string> {
+  const model = genAI.getGenerativeModel({ model: "gemini-2.0-flash" });
+  const result = await model.generateContentStream(buildPlanPrompt(messages, diagnosis, language));
+  for await (const chunk of result.stream) {
+    const text = chunk.text();
+    if (text) {
+      yield text;
+    }
+  }
+}
+
+export interface PlanSection {
+  title: string;
+  content: string;
+}
+
+function parsePlanSection(block: string): PlanSection | null {
+  const trimmed = block.trim();
+  if (!trimmed) return null;
+  const [first, ...rest] = trimmed.split("\n");
+  if (!first.startsWith("## ")) {
+    return { title: "", content: trimmed };
+  }
+  return { title: first.slice(3).trim(), content: rest.join("\n").trim() };
+}
+
+// Cuts streamed plan markdown into "## " sections; a section is complete once
+// the next heading starts (or the stream ends).
+export class PlanSectionSplitter {
+  text = "";
+  private emitted = 0;
+
+  push(chunk: string): PlanSection[] {
+    this.text += chunk;
+    const sections: PlanSection[] = [];
+    let next = this.text.indexOf("\n## ", this.emitted + 1);
+    while (next !== -1) {
+      const section = parsePlanSection(this.text.slice(this.emitted, next));
+      if (section) sections.push(section);
+      this.emitted = next + 1;
+      next = this.text.indexOf("\n## ", this.emitted + 1);
+    }
+    return sections;
+  }
+
+  end(): PlanSection[] {
+    const section = parsePlanSection(this.text.slice(this.emitted));
+    this.emitted = this.text.length;
+    return section ? [section] : [];
+  }
+}
+
 function getGreeting(language: string): string {
   switch (language) {
     case "Telugu":
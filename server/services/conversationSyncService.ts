@@ -0,0 +1,89 @@
+import type { ChatMessage } from "./chatService";
+
+const SESSION_TTL_MS = 60 * 60 * 1000;
+const MAX_SESSIONS = 5000;
+const MAX_MESSAGES_PER_SESSION = 200;
+
+export interface SyncedMessage extends ChatMessage {
+  seq?: number;
+}
+
+export interface ConversationSyncRequest {
+  messages: SyncedMessage[];
+  sessionId?: string;
+  baseSeq?: number;
+  reset?: boolean;
+  summary?: string;
+}
+
+interface ConversationSession {
+  seq: number;
+  summary: string;
+  messages: ChatMessage[];
+  updatedAt: number;
+}
+
+export class ConversationOutOfSyncError extends Error {
+  constructor(public readonly seq: number) {
+    super("Conversation state out of sync");
+  }
+}
+
+const sessions = new Map<string, ConversationSession>();
+
+function evictSessions(now: number) {
+  sessions.forEach((session, id) => {
+    if (now - session.updatedAt > SESSION_TTL_MS) {
+      sessions.delete(id);
+    }
+  });
+  while (sessions.size > MAX_SESSIONS) {
+    const oldest = sessions.keys().next().value;
+    if (oldest === undefined) break;
+    sessions.delete(oldest);
+  }
+}
+
+function withSummary(session: ConversationSession): ChatMessage[] {
+  if (!session.summary) {
+    return session.messages;
+  }
+  return [
+    { role: "user", content: `[Summary of the earlier conversation]\n${session.summary}` },
+    ...session.messages,
+  ];
+}
+
+export function resolveConversation(request: ConversationSyncRequest): { messages: ChatMessage[]; seq?: number } {
+  const plain = request.messages.map(({ role, content }) => ({ role, content }));
+  if (!request.sessionId) {
+    return { messages: plain };
+  }
+
+  const now = Date.now();
+  evictSessions(now);
+
+  let session = sessions.get(request.sessionId);
+  const baseSeq = request.baseSeq ?? 0;
+  if (request.reset || (!session && baseSeq === 0)) {
+    session = { seq: 0, summary: request.summary || "", messages: [], updatedAt: now };
+  } else if (!session || baseSeq > session.seq) {
+    // A baseSeq behind the session is a replayed or hedged delta: messages
+    // already applied are skipped by seq below, so only gaps force a resync.
+    throw new ConversationOutOfSyncError(session?.seq ?? 0);
+  }
+
+  for (const message of request.messages) {
+    if (message.seq !== undefined && message.seq <= session.seq) continue;
+    session.messages.push({ role: message.role, content: message.content });
+    session.seq = message.seq ?? session.seq + 1;
+  }
+  if (session.messages.length > MAX_MESSAGES_PER_SESSION) {
+    session.messages = session.messages.slice(-MAX_MESSAGES_PER_SESSION);
+  }
+  session.updatedAt = now;
+
+  sessions.delete(request.sessionId);
+  sessions.set(request.sessionId, session);
+  return { messages: withSummary(session), seq: session.seq };
+}
@@ -0,0 +1,146 @@
+import { randomBytes } from "crypto";
+import { promises as fs } from "fs";
+import path from "path";
+import { deflateSync } from "zlib";
+import type { ChatMessage } from "./chatService";
+
+// Snapshot layout, shared with livekit_agent/session_state.py:
+//   "KS" | version (u8) | zlib-compressed UTF-8 JSON with one-letter keys.
+const SNAPSHOT_MAGIC = Buffer.from("KS");
+const SNAPSHOT_VERSION = 1;
+const PLAN_STATUSES = ["none", "partial", "done"] as const;
+const ROLES = ["user", "assistant"];
+const EXPIRY_HEADER_BYTES = 8;
+const SWEEP_INTERVAL_MS = 60 * 1000;
+
+// Must point at storage the voice agent can read too; when unset, sessions
+// are handed over inline in room metadata instead.
+const SESSION_STATE_STORE = process.env.SESSION_STATE_STORE || "";
+const SESSION_STATE_TTL_SECONDS = parseInt(process.env.SESSION_STATE_TTL_SECONDS || String(6 * 3600), 10);
+
+export type PlanStatus = (typeof PLAN_STATUSES)[number];
+
+export interface SessionState {
+  language: string;
+  phone: string;
+  imageUrls: string[];
+  messages: ChatMessage[];
+  summary?: string;
+  crop?: string | null;
+  location?: string | null;
+  diagnosis?: Record<string, any> | null;
+  planStatus?: PlanStatus;
+}
+
+export interface SessionStateStore {
+  get(key: string): Promise<Buffer | null>;
+  set(key: string, value: Buffer, ttlSeconds?: number): Promise<void>;
+  del(key: string): Promise<void>;
+}
+
+export function encodeSessionState(state: SessionState): Buffer {
+  const payload = {
+    l: state.language,
+    p: state.phone,
+    i: state.imageUrls,
+    h: state.messages
+      .filter((m) => ROLES.includes(m.role))
+      .map((m) => [ROLES.indexOf(m.role), m.content]),
+    s: state.summary || "",
+    c: state.crop ?? null,
+    o: state.location ?? null,
+    d: state.diagnosis ?? null,
+    g: PLAN_STATUSES.indexOf(state.planStatus || "none"),
+  };
+  const body = deflateSync(Buffer.from(JSON.stringify(payload), "utf-8"), { level: 9 });
+  return Buffer.concat([SNAPSHOT_MAGIC, Buffer.from([SNAPSHOT_VERSION]), body]);
+}
+
+export class FileSessionStateStore implements SessionStateStore {
+  private lastSweep = 0;
+
+  constructor(private readonly directory: string) {}
+
+  private filePath(key: string): string {
+    return path.join(this.directory, `${key}.kss`);
+  }
+
+  async get(key: string): Promise<Buffer | null> {
+    let data: Buffer;
+    try {
+      data = await fs.readFile(this.filePath(key));
+    } catch (error: any) {
+      if (error.code === "ENOENT") return null;
+      throw error;
+    }
+    const expiresAt = Number(data.readBigUInt64BE(0));
+    if (expiresAt && expiresAt < Date.now() / 1000) {
+      await this.del(key);
+      return null;
+    }
+    return data.subarray(EXPIRY_HEADER_BYTES);
+  }
+
+  async set(key: string, value: Buffer, ttlSeconds?: number): Promise<void> {
+    const header = Buffer.alloc(EXPIRY_HEADER_BYTES);
+    header.writeBigUInt64BE(BigInt(ttlSeconds ? Math.floor(Date.now() / 1000) + ttlSeconds : 0));
+    await fs.mkdir(this.directory, { recursive: true });
+    const target = this.filePath(key);
+    await fs.writeFile(`${target}.tmp`, Buffer.concat([header, value]));
+    await fs.rename(`${target}.tmp`, target);
+    await this.sweep();
+  }
+
+  // Keys are single-use and the agent deletes them on load; this clears the
+  // ones no agent ever picked up.
+  private async sweep(): Promise<void> {
+    const now = Date.now();
+    if (now - this.lastSweep < SWEEP_INTERVAL_MS) return;
+    this.lastSweep = now;
+    for (const name of await fs.readdir(this.directory)) {
+      if (!name.endsWith(".kss")) continue;
+      const file = path.join(this.directory, name);
+      try {
+        const handle = await fs.open(file, "r");
+        const header = Buffer.alloc(EXPIRY_HEADER_BYTES);
+        try {
+          await handle.read(header, 0, EXPIRY_HEADER_BYTES, 0);
+        } finally {
+          await handle.close();
+        }
+        const expiresAt = Number(header.readBigUInt64BE(0));
+        if (expiresAt && expiresAt < now / 1000) {
+          await fs.rm(file, { force: true });
+        }
+      } catch {
+        continue;
+      }
+    }
+  }
+
+  async del(key: string): Promise<void> {
+    await fs.rm(this.filePath(key), { force: true });
+  }
+}
+
+let store: SessionStateStore | null = null;
+
+function getSessionStateStore(): SessionStateStore {
+  if (!store) {
+    const url = new URL(SESSION_STATE_STORE);
+    if (url.protocol !== "file:") {
+      // The agent can also read sqlite:// and redis:// stores; the server only
+      // writes the file store, so other URLs fall back to inline metadata.
+      throw new Error(`SESSION_STATE_STORE ${url.protocol}// is not supported by the server`);
+    }
+    store = new FileSessionStateStore(decodeURIComponent(url.pathname));
+  }
+  return store;
+}
+
+export async function saveSessionState(state: SessionState): Promise<string | null> {
+  if (!SESSION_STATE_STORE) return null;
+  const key = randomBytes(9).toString("base64url");
+  await getSessionStateStore().set(key, encodeSessionState(state), SESSION_STATE_TTL_SECONDS);
+  return key;
+}